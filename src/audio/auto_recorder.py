@@ -12,6 +12,7 @@ from enum import Enum
 from .circular_buffer import CircularBuffer
 from .activity_detector import AudioActivityDetector
 from .post_processor import AudioPostProcessor
+from .pcm import float_to_int16
 
 class RecordingState(Enum):
     IDLE = "idle"
@@ -55,6 +56,8 @@ class AutoAudioRecorder:
         
         # 回调和日志
         self.status_callback: Optional[Callable[[str], None]] = None
+        self.indicator_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._last_indicators = None
         self.logger = logging.getLogger(__name__)
         
         # 通话信息
@@ -68,6 +71,29 @@ class AutoAudioRecorder:
         """设置状态回调函数"""
         self.status_callback = callback
     
+    def set_indicator_callback(self, callback: Callable[[Dict[str, Any]], None]):
+        """设置指示器回调函数（仅在活动/状态变化时触发）"""
+        self.indicator_callback = callback
+    
+    def _notify_indicators(self):
+        """当麦克风/系统音频活跃或录制状态变化时通知指示器"""
+        if not self.indicator_callback:
+            return
+        
+        mic_active = self.is_monitoring and self.activity_detector.mic_active_start is not None
+        system_active = self.is_monitoring and self.activity_detector.system_active_start is not None
+        indicators = (self.is_monitoring, self.state.value, mic_active, system_active)
+        if indicators == self._last_indicators:
+            return
+        
+        self._last_indicators = indicators
+        self.indicator_callback({
+            'monitoring': self.is_monitoring,
+            'state': self.state.value,
+            'mic_active': mic_active,
+            'system_active': system_active
+        })
+    
     def _notify_status(self, message: str):
         """通知状态变化"""
         self.logger.info(message)
@@ -110,6 +136,7 @@ class AutoAudioRecorder:
             )
             self.monitor_thread.start()
             
+            self._notify_indicators()
             self._notify_status("🔍 开始监听音频活动...")
             return True
             
@@ -139,6 +166,7 @@ class AutoAudioRecorder:
             self.monitor_thread.join(timeout=5.0)
         
         self.state = RecordingState.IDLE
+        self._notify_indicators()
         
         # 停止后处理器
         if hasattr(self, 'post_processor'):
@@ -198,7 +226,7 @@ class AutoAudioRecorder:
                     self._mic_callback_count = 1
                 
                 if self._mic_callback_count % 100 == 0:
-                    volume = np.max(np.abs(audio_data)) if len(audio_data) > 0 else 0
+                    volume = max(audio_data.max(), -audio_data.min()) if len(audio_data) > 0 else 0
                     self.logger.debug(f"麦克风 #{self._mic_callback_count}: 音量={volume:.4f}, 活跃={is_active}")
         
         # 系统音频流
@@ -226,7 +254,7 @@ class AutoAudioRecorder:
                     self._system_callback_count = 1
                 
                 if self._system_callback_count % 100 == 0:
-                    volume = np.max(np.abs(audio_data)) if len(audio_data) > 0 else 0
+                    volume = max(audio_data.max(), -audio_data.min()) if len(audio_data) > 0 else 0
                     self.logger.debug(f"系统音频 #{self._system_callback_count}: 音量={volume:.4f}, 活跃={is_active}")
         
         # 启动流
@@ -301,6 +329,7 @@ class AutoAudioRecorder:
                         status = self.activity_detector.get_status()
                         self.logger.debug(f"检查停止录制: should_stop={should_stop}, 静默时长={status.get('silence_duration', 0):.1f}s, 阈值={self.activity_detector.end_silence_duration}s")
                 
+                self._notify_indicators()
                 time.sleep(check_interval)
                 
             except Exception as e:
@@ -438,11 +467,13 @@ class AutoAudioRecorder:
             audio_data = np.array(data, dtype=np.float32)
             
             # 标准化
-            if np.max(np.abs(audio_data)) > 0:
-                audio_data = audio_data / np.max(np.abs(audio_data)) * 0.95
+            # max/min 两次归约求峰值，不生成 |audio_data| 临时数组
+            peak = float(max(audio_data.max(), -audio_data.min())) if audio_data.size else 0.0
+            if peak > 0:
+                audio_data *= 0.95 / peak
             
             # 转换为16位整数
-            audio_data_int16 = (audio_data * 32767).astype(np.int16)
+            audio_data_int16 = float_to_int16(audio_data)
             
             with wave.open(filepath, 'wb') as wf:
                 wf.setnchannels(1)
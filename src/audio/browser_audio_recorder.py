@@ -11,6 +11,7 @@ from enum import Enum
 from .wasapi_recorder import WASAPIRecorder
 from .circular_buffer import CircularBuffer
 from .activity_detector import AudioActivityDetector
+from .pcm import float_to_int16
 
 class BrowserRecordingState(Enum):
     IDLE = "idle"
@@ -400,11 +401,13 @@ class BrowserAudioRecorder:
             audio_data = np.array(data, dtype=np.float32)
             
             # 标准化
-            if np.max(np.abs(audio_data)) > 0:
-                audio_data = audio_data / np.max(np.abs(audio_data)) * 0.95
+            # max/min 两次归约求峰值，不生成 |audio_data| 临时数组
+            peak = float(max(audio_data.max(), -audio_data.min())) if audio_data.size else 0.0
+            if peak > 0:
+                audio_data *= 0.95 / peak
             
             # 转换为16位整数
-            audio_data_int16 = (audio_data * 32767).astype(np.int16)
+            audio_data_int16 = float_to_int16(audio_data)
             
             with wave.open(filepath, 'wb') as wf:
                 wf.setnchannels(1)
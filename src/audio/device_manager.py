@@ -1,11 +1,18 @@
 import sounddevice as sd
 import platform
+from functools import cached_property
 
 class DeviceManager:
     def __init__(self):
         self.devices = sd.query_devices()
         self.system = platform.system()
     
+    def invalidate(self):
+        """重新查询设备列表并清除缓存（设备插拔后调用）"""
+        self.devices = sd.query_devices()
+        self.__dict__.pop('device_table', None)
+        self.__dict__.pop('loopback_device', None)
+    
     def get_input_devices(self):
         """获取输入设备（麦克风）"""
         return [(i, d) for i, d in enumerate(self.devices) if d['max_input_channels'] > 0]
@@ -14,25 +21,32 @@ class DeviceManager:
         """获取输出设备（扬声器）"""
         return [(i, d) for i, d in enumerate(self.devices) if d['max_output_channels'] > 0]
     
-    def get_loopback_device(self):
-        """获取回环设备（用于录制系统音频）"""
+    # 回环设备关键词
+    WINDOWS_LOOPBACK_KEYWORDS = (
+        'loopback', 'stereo mix', 'what u hear', 'wave out mix',
+        '立体声混音', '混音', 'stereo input'
+    )
+    MAC_LOOPBACK_KEYWORDS = ('blackhole', 'soundflower', 'virtual')
+    
+    @cached_property
+    def loopback_device(self):
+        """回环设备ID（缓存，invalidate 后重新查找）"""
         if self.system == "Windows":
-            for i, device in enumerate(self.devices):
-                name = device['name'].lower()
-                # Windows回环设备关键词
-                windows_keywords = [
-                    'loopback', 'stereo mix', 'what u hear', 'wave out mix',
-                    '立体声混音', '混音', 'stereo input'
-                ]
-                if any(keyword in name for keyword in windows_keywords):
-                    return i
+            keywords = self.WINDOWS_LOOPBACK_KEYWORDS
         elif self.system == "Darwin":
-            for i, device in enumerate(self.devices):
-                name = device['name'].lower()
-                if any(keyword in name for keyword in ['blackhole', 'soundflower', 'virtual']):
-                    return i
+            keywords = self.MAC_LOOPBACK_KEYWORDS
+        else:
+            return None
+        for i, device in enumerate(self.devices):
+            name = device['name'].lower()
+            if any(keyword in name for keyword in keywords):
+                return i
         return None
     
+    def get_loopback_device(self):
+        """获取回环设备（用于录制系统音频）"""
+        return self.loopback_device
+    
     def get_default_input(self):
         """获取默认输入设备"""
         return sd.default.device[0]
@@ -41,21 +55,27 @@ class DeviceManager:
         """获取默认输出设备"""
         return sd.default.device[1]
     
-    def print_devices(self):
-        """打印所有设备信息"""
-        print("=== 音频设备列表 ===")
+    @cached_property
+    def device_table(self):
+        """格式化后的设备列表文本（缓存，invalidate 后重新生成）"""
+        lines = ["=== 音频设备列表 ==="]
         for i, device in enumerate(self.devices):
             device_type = []
             if device['max_input_channels'] > 0:
                 device_type.append("输入")
             if device['max_output_channels'] > 0:
                 device_type.append("输出")
-            print(f"[{i}] {device['name']} - {'/'.join(device_type)}")
+            lines.append(f"[{i}] {device['name']} - {'/'.join(device_type)}")
             
         loopback = self.get_loopback_device()
-        if loopback:
-            print(f"\n找到回环设备: [{loopback}] {self.devices[loopback]['name']}")
+        if loopback is not None:
+            lines.append(f"\n找到回环设备: [{loopback}] {self.devices[loopback]['name']}")
         else:
-            print(f"\n未找到回环设备 (系统: {self.system})")
+            lines.append(f"\n未找到回环设备 (系统: {self.system})")
             if self.system == "Darwin":
-                print("提示: macOS 需要安装 BlackHole 等虚拟音频设备")
\ No newline at end of file
+                lines.append("提示: macOS 需要安装 BlackHole 等虚拟音频设备")
+        return '\n'.join(lines)
+    
+    def print_devices(self):
+        """打印所有设备信息"""
+        print(self.device_table)
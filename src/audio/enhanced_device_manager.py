@@ -1,6 +1,7 @@
 import sounddevice as sd
 import platform
 import logging
+import threading
 from typing import List, Tuple, Optional, Dict
 
 class EnhancedDeviceManager:
@@ -10,6 +11,16 @@ class EnhancedDeviceManager:
         self.devices = sd.query_devices()
         self.system = platform.system()
         self.logger = logging.getLogger(__name__)
+        # 设备可用性探测结果缓存，键为 (设备ID, 设备名)
+        self._availability_cache: Dict[Tuple[int, str], bool] = {}
+        # 串行化探测：PortAudio 并发打开/关闭流不安全，也避免多个线程重复探测同一设备
+        self._probe_lock = threading.Lock()
+        
+    def rescan(self):
+        """重新查询设备列表并清空可用性缓存"""
+        with self._probe_lock:
+            self.devices = sd.query_devices()
+            self._availability_cache.clear()
         
     def _get_hostapi_name(self, hostapi_id: int) -> str:
         """安全获取主机API名称"""
@@ -17,7 +28,7 @@ class EnhancedDeviceManager:
             if hostapi_id >= 0:
                 return sd.query_hostapis()[hostapi_id]['name']
             return 'Unknown'
-        except:
+        except (IndexError, KeyError, sd.PortAudioError):
             return f'API-{hostapi_id}'
         
     def get_input_devices(self) -> List[Tuple[int, Dict]]:
@@ -102,7 +113,18 @@ class EnhancedDeviceManager:
         return physical_mics
     
     def test_device_availability(self, device_id: int) -> bool:
-        """测试设备是否可用（使用回调模式）"""
+        """测试设备是否可用（结果按设备缓存，重新创建管理器后失效）"""
+        device = self.get_device_info(device_id)
+        key = (device_id, device['name'] if device else '')
+        with self._probe_lock:
+            cached = self._availability_cache.get(key)
+            if cached is None:
+                cached = self._probe_device_availability(device_id)
+                self._availability_cache[key] = cached
+        return cached
+    
+    def _probe_device_availability(self, device_id: int) -> bool:
+        """实际打开输入流测试设备是否可用（使用回调模式）"""
         import time
         
         # 尝试多种采样率
@@ -149,11 +171,9 @@ class EnhancedDeviceManager:
     
     def get_device_info(self, device_id: int) -> Optional[Dict]:
         """获取设备详细信息"""
-        try:
-            if 0 <= device_id < len(self.devices):
-                return self.devices[device_id]
-        except:
-            pass
+        # PyAudio 设备ID为 "PA:idx" 字符串，不在 sounddevice 列表中
+        if isinstance(device_id, int) and 0 <= device_id < len(self.devices):
+            return self.devices[device_id]
         return None
     
     def print_devices(self):
@@ -294,14 +314,14 @@ class EnhancedDeviceManager:
         """获取默认输入设备"""
         try:
             return sd.default.device[0]
-        except:
+        except (IndexError, TypeError, sd.PortAudioError):
             return None
     
     def get_default_output(self) -> Optional[int]:
         """获取默认输出设备"""
         try:
             return sd.default.device[1]
-        except:
+        except (IndexError, TypeError, sd.PortAudioError):
             return None
     
     def get_recommended_devices(self) -> Dict[str, Optional[int]]:
@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import Optional, Dict, Any, Callable
 import os
 from .post_processor import AudioPostProcessor
+from .pcm import float_to_int16
 
 class EnhancedAudioRecorder:
     """增强版音频录制器，提供更稳定的录音功能和错误处理"""
@@ -238,7 +239,7 @@ class EnhancedAudioRecorder:
                     
                     # 每100次回调输出一次调试信息
                     if callback_count % 100 == 0:
-                        volume = np.max(np.abs(audio_data)) if len(audio_data) > 0 else 0
+                        volume = max(audio_data.max(), -audio_data.min()) if len(audio_data) > 0 else 0
                         self.logger.debug(f"系统音频 callback #{callback_count}, 音量: {volume:.4f}, 总数据: {data_received}")
             
             with sd.InputStream(
@@ -274,11 +275,13 @@ class EnhancedAudioRecorder:
             audio_data = np.array(data, dtype=np.float32)
             
             # 标准化音频数据
-            if np.max(np.abs(audio_data)) > 0:
-                audio_data = audio_data / np.max(np.abs(audio_data)) * 0.95
+            # max/min 两次归约求峰值，不生成 |audio_data| 临时数组
+            peak = float(max(audio_data.max(), -audio_data.min())) if audio_data.size else 0.0
+            if peak > 0:
+                audio_data *= 0.95 / peak
             
             # 转换为16位整数
-            audio_data_int16 = (audio_data * 32767).astype(np.int16)
+            audio_data_int16 = float_to_int16(audio_data)
             
             with wave.open(filepath, 'wb') as wf:
                 wf.setnchannels(1)  # 单声道
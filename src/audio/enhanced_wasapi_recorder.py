@@ -8,6 +8,8 @@ import platform
 from typing import Optional, Callable, Dict, Any
 from datetime import datetime
 
+from .pcm import float_to_int16
+
 class EnhancedWASAPIRecorder:
     """增强的音频录制器 - 支持WASAPI Loopback + sounddevice fallback"""
     
@@ -349,8 +351,13 @@ class EnhancedWASAPIRecorder:
         except Exception as e:
             self.logger.error(f"麦克风流启动失败: {e}")
     
-    def stop_recording(self) -> Optional[Dict[str, Any]]:
-        """停止录制"""
+    def stop_recording(self, out_basename: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """停止录制
+        
+        Args:
+            out_basename: 最终文件名（不含 mic_/system_ 前缀和扩展名）；
+                为空时使用 tmp_ 前缀的临时文件名
+        """
         if not self._recording:
             return None
         
@@ -413,7 +420,8 @@ class EnhancedWASAPIRecorder:
             # mic 作为基准：不补前置静音，不强行裁剪
             mic_aligned = np.asarray(self.recording_mic_data, dtype=np.float32)
             self.logger.info(f"MIC 保存前: frames={len(mic_aligned)}, secs={len(mic_aligned)/sample_rate:.3f}")
-            mic_file_tmp = os.path.join(output_dir, f"tmp_mic_{timestamp}.wav")
+            mic_name = f"mic_{out_basename}.wav" if out_basename else f"tmp_mic_{timestamp}.wav"
+            mic_file_tmp = os.path.join(output_dir, mic_name)
             if self._save_audio_file(mic_aligned, mic_file_tmp, sample_rate):
                 mic_file = mic_file_tmp
                 mic_success = True
@@ -474,7 +482,8 @@ class EnhancedWASAPIRecorder:
             else:
                 system_aligned = sys_arr
                 self.logger.info(f"SYS 对齐完成: frames={len(system_aligned)}")
-            speaker_file_tmp = os.path.join(output_dir, f"tmp_system_{timestamp}.wav")
+            speaker_name = f"system_{out_basename}.wav" if out_basename else f"tmp_system_{timestamp}.wav"
+            speaker_file_tmp = os.path.join(output_dir, speaker_name)
             if self._save_audio_file(system_aligned, speaker_file_tmp, sample_rate):
                 speaker_file = speaker_file_tmp
                 speaker_success = True
@@ -494,11 +503,10 @@ class EnhancedWASAPIRecorder:
     def _save_audio_file(self, data: list, filepath: str, sample_rate: int) -> bool:
         """保存单声道 float32 数据为 WAV 文件"""
         try:
-            audio = np.asarray(data, dtype=np.float32)
+            audio = np.array(data, dtype=np.float32)
             if audio.size == 0:
                 return False
-            audio = np.clip(audio, -1.0, 1.0)
-            audio_i16 = (audio * 32767.0).astype(np.int16)
+            audio_i16 = float_to_int16(audio)
             with wave.open(filepath, 'wb') as wf:
                 wf.setnchannels(1)
                 wf.setsampwidth(2)
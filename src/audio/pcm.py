@@ -0,0 +1,12 @@
+import numpy as np
+
+
+def float_to_int16(audio: np.ndarray) -> np.ndarray:
+    """float [-1, 1] 转 int16：原地缩放、限幅、取整后只做一次类型转换
+
+    会修改传入数组，调用方需保证 audio 是可写的私有副本；超出范围的样本饱和而不是回绕
+    """
+    np.multiply(audio, 32767.0, out=audio)
+    np.clip(audio, -32768, 32767, out=audio)
+    np.rint(audio, out=audio)
+    return audio.astype(np.int16)
@@ -2,10 +2,13 @@ import os
 import wave
 import numpy as np
 import threading
-from queue import Queue
+from queue import Queue, Empty
+from concurrent.futures import Future
 from datetime import datetime
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from .pcm import float_to_int16
 
 class AudioPostProcessor:
     """音频后处理器 - 验证、合并、上传录音文件"""
@@ -17,6 +20,12 @@ class AudioPostProcessor:
         self.worker_thread = None
         self.is_running = False
         self.logger = logging.getLogger(__name__)
+        self._uploader = None  # 首次上传时创建，之后复用同一个上传队列
+        self.complete_callback: Optional[Callable[[Dict[str, Any], Optional[str], str], None]] = None
+        
+    def set_complete_callback(self, callback: Callable[[Dict[str, Any], Optional[str], str], None]):
+        """设置处理完成回调 (call_info, 合并文件路径, 状态)，状态为 'merged' / 'rejected' / 'error'"""
+        self.complete_callback = callback
         
     def start(self):
         """启动后处理器"""
@@ -33,79 +42,112 @@ class AudioPostProcessor:
         self.is_running = False
         if self.worker_thread:
             self.worker_thread.join(timeout=5.0)
+        
+        # 未处理的任务不会再执行，取消其 Future 以免等待方一直阻塞
+        while True:
+            try:
+                self.processing_queue.get_nowait()['future'].cancel()
+            except Empty:
+                break
         self.logger.info("音频后处理器已停止")
     
-    def submit_recording(self, mic_file: str, system_file: str, call_info: Dict[str, Any]):
-        """提交录音文件进行后处理"""
+    def submit_recording(self, mic_file: str, system_file: str, call_info: Dict[str, Any]) -> Future:
+        """提交录音文件进行后处理，返回 Future（结果为合并文件路径，无效录音为None，处理失败时携带异常）"""
+        future = Future()
         session_data = {
             'mic_file': mic_file,
             'system_file': system_file,
             'call_info': call_info,
-            'timestamp': datetime.now()
+            'timestamp': datetime.now(),
+            'future': future
         }
         self.processing_queue.put(session_data)
         self.logger.info(f"录音文件已提交后处理: {os.path.basename(mic_file) if mic_file else 'None'}, {os.path.basename(system_file) if system_file else 'None'}")
+        return future
     
     def _process_worker(self):
         """后处理工作线程"""
         while self.is_running:
             try:
                 session_data = self.processing_queue.get(timeout=1.0)
-                self._process_recording(session_data)
-            except:
+            except Empty:
                 continue
+            
+            future = session_data['future']
+            if not future.set_running_or_notify_cancel():
+                continue
+            output_path = None
+            try:
+                output_path = self._process_recording(session_data)
+                status = 'merged' if output_path else 'rejected'
+                future.set_result(output_path)
+            except Exception as e:
+                self.logger.exception(f"录音处理失败: {e}")
+                status = 'error'
+                future.set_exception(e)
+            
+            if self.complete_callback:
+                try:
+                    self.complete_callback(session_data['call_info'], output_path, status)
+                except Exception as e:
+                    self.logger.error(f"完成回调执行失败: {e}")
     
-    def _process_recording(self, session_data: Dict[str, Any]):
-        """处理单个录音会话"""
+    def _process_recording(self, session_data: Dict[str, Any]) -> Optional[str]:
+        """处理单个录音会话，返回合并后的文件路径
+        
+        只有时长过短、单侧静音这两种无效录音返回None；合并失败抛出异常，上传失败只记录日志
+        """
         mic_file = session_data['mic_file']
         system_file = session_data['system_file']
         call_info = session_data['call_info']
         
-        try:
-            self.logger.info(f"开始处理录音: {os.path.basename(mic_file) if mic_file else 'None'}")
-            
-            # 1. 检测时长
-            duration = self._get_audio_duration(mic_file or system_file)
-            if duration < self.config.get('min_duration', 5.0):
-                self.logger.info(f"录音时长过短({duration:.1f}s)，标记为无效")
-                self._cleanup_invalid(mic_file, system_file)
-                return
-            
-            # 2. 检测单侧静音
-            if self._is_single_side_silent(mic_file, system_file):
-                self.logger.info("检测到单侧静音，标记为无效")
-                self._cleanup_invalid(mic_file, system_file)
-                return
-            
-            # 3. 合并为双声道
-            merged_file = self._merge_to_stereo(mic_file, system_file, call_info)
-            if not merged_file:
-                self.logger.error("文件合并失败")
-                return
-            
-            # 4. 上传OSS
-            if self.settings.upload.get('enabled', False):
+        self.logger.info(f"开始处理录音: {os.path.basename(mic_file) if mic_file else 'None'}")
+        
+        # 1. 检测时长
+        duration = self._get_audio_duration(mic_file or system_file)
+        if duration < self.config.get('min_duration', 5.0):
+            self.logger.info(f"录音时长过短({duration:.1f}s)，标记为无效")
+            self._cleanup_invalid(mic_file, system_file)
+            return None
+        
+        # 2. 检测单侧静音
+        if self._is_single_side_silent(mic_file, system_file):
+            self.logger.info("检测到单侧静音，标记为无效")
+            self._cleanup_invalid(mic_file, system_file)
+            return None
+        
+        # 3. 合并为双声道
+        merged_file = self._merge_to_stereo(mic_file, system_file, call_info)
+        if not merged_file:
+            raise RuntimeError("文件合并失败")
+        
+        # 4. 上传OSS：合并文件已落盘，上传失败只记录，不影响本次处理结果
+        if self.settings.upload.get('enabled', False):
+            try:
                 self._upload_merged_file(merged_file, call_info)
+            except Exception:
+                self.logger.exception(f"上传合并文件失败: {os.path.basename(merged_file)}")
+        
+        # 5. 清理原始文件
+        if not self.config.get('keep_original', False):
+            self._cleanup_original(mic_file, system_file)
             
-            # 5. 清理原始文件
-            if not self.config.get('keep_original', False):
-                self._cleanup_original(mic_file, system_file)
-                
-            self.logger.info(f"录音处理完成: {os.path.basename(merged_file)}")
-            
-        except Exception as e:
-            self.logger.error(f"录音处理失败: {e}")
+        self.logger.info(f"录音处理完成: {os.path.basename(merged_file)}")
+        return merged_file
     
     def _get_audio_duration(self, audio_file: str) -> float:
         """获取音频文件时长"""
-        if not audio_file or not os.path.exists(audio_file):
+        if not audio_file:
             return 0.0
         
+        # 直接打开，不存在时由 FileNotFoundError 处理，省去单独的 exists 检查
         try:
             with wave.open(audio_file, 'rb') as wf:
                 frames = wf.getnframes()
                 sample_rate = wf.getframerate()
                 return frames / sample_rate
+        except FileNotFoundError:
+            return 0.0
         except Exception as e:
             self.logger.error(f"获取音频时长失败: {e}")
             return 0.0
@@ -120,7 +162,7 @@ class AudioPostProcessor:
     
     def _is_audio_silent(self, audio_file: str) -> bool:
         """检测音频文件是否基本无声"""
-        if not audio_file or not os.path.exists(audio_file):
+        if not audio_file:
             return True
         
         try:
@@ -149,71 +191,71 @@ class AudioPostProcessor:
                 
             return (silent_frames / total_frames) > silence_ratio
             
+        except FileNotFoundError:
+            return True
         except Exception as e:
             self.logger.error(f"检测音频静音失败: {e}")
             return True
     
     def _merge_to_stereo(self, mic_file: str, system_file: str, call_info: Dict[str, Any]) -> Optional[str]:
-        """合并为双声道文件"""
-        try:
-            # 读取音频数据
-            mic_data = self._read_audio_file(mic_file) if mic_file else None
-            system_data = self._read_audio_file(system_file) if system_file else None
-            
-            if mic_data is None and system_data is None:
-                return None
-            
-            # 确定最大长度
-            max_length = 0
-            if mic_data is not None:
-                max_length = max(max_length, len(mic_data))
-            if system_data is not None:
-                max_length = max(max_length, len(system_data))
-            
-            # 填充到相同长度
-            if mic_data is None:
-                mic_data = np.zeros(max_length, dtype=np.float32)
-            elif len(mic_data) < max_length:
-                mic_data = np.pad(mic_data, (0, max_length - len(mic_data)))
-            
-            if system_data is None:
-                system_data = np.zeros(max_length, dtype=np.float32)
-            elif len(system_data) < max_length:
-                system_data = np.pad(system_data, (0, max_length - len(system_data)))
-            
-            # 合并为双声道 (左声道:mic, 右声道:system)
-            stereo_data = np.column_stack((mic_data, system_data))
-            
-            # 生成合并文件名
-            merged_filename = self._generate_merged_filename(mic_file or system_file, call_info)
-            merged_path = os.path.join(self.settings.recording['output_dir'], merged_filename)
-            
-            # 保存双声道文件
-            with wave.open(merged_path, 'wb') as wf:
-                wf.setnchannels(2)  # 双声道
-                wf.setsampwidth(2)
-                wf.setframerate(self.settings.audio['sample_rate'])
-                
-                # 转换为int16并保存
-                stereo_int16 = (stereo_data * 32767).astype(np.int16)
-                wf.writeframes(stereo_int16.tobytes())
-            
-            self.logger.info(f"双声道文件合并完成: {merged_filename}")
-            return merged_path
-            
-        except Exception as e:
-            self.logger.error(f"合并双声道文件失败: {e}")
+        """合并为双声道文件（两侧都读不到数据时返回None，写出失败抛出异常）"""
+        # 读取音频数据
+        mic_data = self._read_audio_file(mic_file) if mic_file else None
+        system_data = self._read_audio_file(system_file) if system_file else None
+        
+        if mic_data is None and system_data is None:
             return None
+        
+        # 确定最大长度
+        max_length = 0
+        if mic_data is not None:
+            max_length = max(max_length, len(mic_data))
+        if system_data is not None:
+            max_length = max(max_length, len(system_data))
+        
+        # 填充到相同长度
+        if mic_data is None:
+            mic_data = np.zeros(max_length, dtype=np.float32)
+        elif len(mic_data) < max_length:
+            mic_data = np.pad(mic_data, (0, max_length - len(mic_data)))
+        
+        if system_data is None:
+            system_data = np.zeros(max_length, dtype=np.float32)
+        elif len(system_data) < max_length:
+            system_data = np.pad(system_data, (0, max_length - len(system_data)))
+        
+        # 合并为双声道 (左声道:mic, 右声道:system)
+        stereo_data = np.column_stack((mic_data, system_data))
+        
+        # 生成合并文件名
+        merged_filename = self._generate_merged_filename(mic_file or system_file, call_info)
+        merged_path = os.path.join(self.settings.recording['output_dir'], merged_filename)
+        
+        # 保存双声道文件
+        with wave.open(merged_path, 'wb') as wf:
+            wf.setnchannels(2)  # 双声道
+            wf.setsampwidth(2)
+            wf.setframerate(self.settings.audio['sample_rate'])
+            
+            # 转换为int16并保存
+            stereo_int16 = float_to_int16(stereo_data)
+            wf.writeframes(stereo_int16.tobytes())
+        
+        self.logger.info(f"双声道文件合并完成: {merged_filename}")
+        return merged_path
+
     
     def _read_audio_file(self, audio_file: str) -> Optional[np.ndarray]:
         """读取音频文件数据"""
-        if not audio_file or not os.path.exists(audio_file):
+        if not audio_file:
             return None
         
         try:
             with wave.open(audio_file, 'rb') as wf:
                 frames = wf.readframes(wf.getnframes())
                 return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+        except FileNotFoundError:
+            return None
         except Exception as e:
             self.logger.error(f"读取音频文件失败: {e}")
             return None
@@ -245,39 +287,40 @@ class AudioPostProcessor:
         return '_'.join(filename_parts) + '.wav'
     
     def _upload_merged_file(self, merged_file: str, call_info: Dict[str, Any]):
-        """上传合并后的文件"""
-        try:
+        """上传合并后的文件（创建上传器或提交失败时抛出异常，由调用方记录）"""
+        if self._uploader is None:
             from storage.uploader import FileUploader
-            uploader = FileUploader(self.settings)
-            
-            def upload_callback(success, message):
-                if success:
-                    self.logger.info(f"文件上传成功: {message}")
-                else:
-                    self.logger.error(f"文件上传失败: {message}")
-            
-            # 上传合并文件（作为mic_file参数传递）
-            uploader.upload_files(merged_file, None, call_info, upload_callback)
-            
-        except Exception as e:
-            self.logger.error(f"上传合并文件失败: {e}")
+            self._uploader = FileUploader(self.settings)
+        
+        def upload_callback(success, message):
+            if success:
+                self.logger.info(f"文件上传成功: {message}")
+            else:
+                self.logger.error(f"文件上传失败: {message}")
+        
+        # 上传合并文件（作为mic_file参数传递）
+        self._uploader.upload_files(merged_file, None, call_info, upload_callback)
     
     def _cleanup_invalid(self, mic_file: str, system_file: str):
         """清理无效录音文件"""
         for file_path in [mic_file, system_file]:
-            if file_path and os.path.exists(file_path):
+            if file_path:
                 try:
                     os.remove(file_path)
                     self.logger.info(f"已删除无效文件: {os.path.basename(file_path)}")
+                except FileNotFoundError:
+                    pass
                 except Exception as e:
                     self.logger.error(f"删除无效文件失败: {e}")
     
     def _cleanup_original(self, mic_file: str, system_file: str):
         """清理原始分离文件"""
         for file_path in [mic_file, system_file]:
-            if file_path and os.path.exists(file_path):
+            if file_path:
                 try:
                     os.remove(file_path)
                     self.logger.info(f"已删除原始文件: {os.path.basename(file_path)}")
+                except FileNotFoundError:
+                    pass
                 except Exception as e:
                     self.logger.error(f"删除原始文件失败: {e}")
\ No newline at end of file
@@ -6,6 +6,7 @@ import time
 from datetime import datetime
 import os
 from .post_processor import AudioPostProcessor
+from .pcm import float_to_int16
 
 class AudioRecorder:
     def __init__(self, settings):
@@ -163,7 +164,7 @@ class AudioRecorder:
                 
                 # 转换为 int16
                 audio_data = np.array(data, dtype=np.float32)
-                audio_data = (audio_data * 32767).astype(np.int16)
+                audio_data = float_to_int16(audio_data)
                 wf.writeframes(audio_data.tobytes())
             
             file_size = os.path.getsize(filepath)
@@ -42,6 +42,33 @@ AUDCLNT_STREAMFLAGS_LOOPBACK = 0x00020000
 WAVE_FORMAT_PCM = 1
 CLSCTX_ALL = 23
 
+def raise_audio_thread_priority():
+    """把当前线程注册为 MMCSS "Pro Audio" 任务，由系统多媒体调度提升其优先级
+    
+    返回 MMCSS 句柄（非 Windows 或注册失败时为 None），结束时交给 revert_audio_thread_priority
+    """
+    if platform.system() != "Windows":
+        return None
+    try:
+        avrt = ctypes.WinDLL('avrt')
+        avrt.AvSetMmThreadCharacteristicsW.restype = wintypes.HANDLE
+        avrt.AvSetMmThreadCharacteristicsW.argtypes = [c_wchar_p, POINTER(wintypes.DWORD)]
+        task_index = wintypes.DWORD(0)
+        return avrt.AvSetMmThreadCharacteristicsW("Pro Audio", byref(task_index)) or None
+    except (OSError, AttributeError):
+        return None
+
+def revert_audio_thread_priority(handle):
+    """撤销 raise_audio_thread_priority 的 MMCSS 注册"""
+    if not handle:
+        return
+    try:
+        avrt = ctypes.WinDLL('avrt')
+        avrt.AvRevertMmThreadCharacteristics.argtypes = [wintypes.HANDLE]
+        avrt.AvRevertMmThreadCharacteristics(handle)
+    except (OSError, AttributeError):
+        pass
+
 class WASAPIRecorder:
     """WASAPI Loopback录制器 - 直接录制系统音频输出"""
     
@@ -53,6 +80,9 @@ class WASAPIRecorder:
         self._recording = False
         self._record_thread = None
         self._audio_callback: Optional[Callable[[np.ndarray], None]] = None
+        # 已捕获帧数，供 wait_for_frames 按帧数等待
+        self._frames_captured = 0
+        self._frames_cond = threading.Condition()
         
         # COM对象
         self._com_initialized = False
@@ -273,6 +303,8 @@ class WASAPIRecorder:
             self.logger.error(f"启动音频客户端异常: {e}")
             return False
         
+        with self._frames_cond:
+            self._frames_captured = 0
         self._recording = True
         self._record_thread = threading.Thread(target=self._record_loop, name="WASAPILoopback")
         self._record_thread.start()
@@ -280,12 +312,23 @@ class WASAPIRecorder:
         self.logger.info("WASAPI Loopback录制开始")
         return True
     
+    def wait_for_frames(self, n: int, timeout: Optional[float] = None) -> bool:
+        """阻塞直到本次录制已捕获 n 帧，录制停止或超时返回 False"""
+        with self._frames_cond:
+            self._frames_cond.wait_for(
+                lambda: self._frames_captured >= n or not self._recording,
+                timeout=timeout,
+            )
+            return self._frames_captured >= n
+    
     def stop_recording(self):
         """停止录制"""
         if not self._recording:
             return
         
         self._recording = False
+        with self._frames_cond:
+            self._frames_cond.notify_all()
         
         # 停止音频客户端 - 使用vtable调用
         if self._audio_client:
@@ -317,6 +360,8 @@ class WASAPIRecorder:
             return
         
         self.logger.info("开始WASAPI Loopback音频捕获")
+        # 捕获线程优先于UI/GC等工作，减少丢帧
+        mmcss_handle = raise_audio_thread_priority()
         
         while self._recording:
             try:
@@ -399,6 +444,10 @@ class WASAPIRecorder:
                             # 发送音频数据
                             if self._audio_callback:
                                 self._audio_callback(audio_data)
+                            
+                            with self._frames_cond:
+                                self._frames_captured += len(audio_data)
+                                self._frames_cond.notify_all()
                 
                 except Exception as e:
                     self.logger.error(f"音频数据处理错误: {e}")
@@ -417,6 +466,8 @@ class WASAPIRecorder:
             except Exception as e:
                 self.logger.error(f"录制循环错误: {e}")
                 time.sleep(0.01)
+        
+        revert_audio_thread_priority(mmcss_handle)
     
     def __del__(self):
         """析构函数"""
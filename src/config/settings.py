@@ -1,5 +1,7 @@
 import yaml
 import os
+import functools
+import copy
 
 class Settings:
     def __init__(self, config_path="config.yaml"):
@@ -30,4 +32,15 @@ class Settings:
         """更新自动录制配置"""
         if 'auto_recording' not in self.config:
             self.config['auto_recording'] = {}
-        self.config['auto_recording'][key] = value
\ No newline at end of file
+        self.config['auto_recording'][key] = value
+
+@functools.lru_cache(maxsize=None)
+def _load_settings(abs_path):
+    return Settings(abs_path)
+
+def load_settings(config_path="config.yaml"):
+    """按绝对路径缓存解析结果，同一进程内 YAML 只解析一次
+    
+    每次返回独立的副本，调用方修改配置（如 update_auto_recording）不会影响其他调用方
+    """
+    return copy.deepcopy(_load_settings(os.path.abspath(config_path)))
@@ -1,6 +1,8 @@
 import requests
 import os
 import threading
+import logging
+from queue import Queue
 from datetime import datetime
 import oss2
 
@@ -13,6 +15,11 @@ class FileUploader:
             'bucket': 'rocksilicon-aliyun-oss-01',
             'region': 'cn-beijing'
         }
+        # 上传任务队列，由单个后台线程按顺序处理，避免多个上传争抢带宽
+        self._upload_queue = Queue()
+        self._worker_thread = None
+        self._worker_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
         
     def upload_files(self, mic_file, system_file, call_info, callback=None):
         """
@@ -29,13 +36,22 @@ class FileUploader:
                 callback(False, "上传功能未启用")
             return
         
-        # 异步上传
-        upload_thread = threading.Thread(
-            target=self._upload_worker,
-            args=(mic_file, system_file, call_info, callback)
-        )
-        upload_thread.daemon = True
-        upload_thread.start()
+        # 异步上传：入队，由上传线程依次处理
+        self._upload_queue.put((mic_file, system_file, call_info, callback))
+        with self._worker_lock:
+            if self._worker_thread is None:
+                self._worker_thread = threading.Thread(target=self._queue_worker, daemon=True)
+                self._worker_thread.start()
+    
+    def _queue_worker(self):
+        """上传队列线程"""
+        while True:
+            mic_file, system_file, call_info, callback = self._upload_queue.get()
+            # 单个任务（包括其回调）出错不能让唯一的上传线程退出，否则后续任务永远滞留在队列中
+            try:
+                self._upload_worker(mic_file, system_file, call_info, callback)
+            except Exception:
+                self.logger.exception(f"上传任务执行失败: {mic_file or system_file}")
     
     def _upload_worker(self, mic_file, system_file, call_info, callback):
         """上传工作线程"""
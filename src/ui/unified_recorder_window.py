@@ -1,20 +1,27 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
+import queue
+import time
 from datetime import datetime
 import os
 import sys
 import logging
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor
+
+# 以 src 为顶层包导入；启动脚本通常已插入该路径，此时不再修改 sys.path
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.append(_SRC_DIR)
+
+# 项目根目录下的配置文件
+_CONFIG_PATH = os.path.join(os.path.dirname(_SRC_DIR), "config.yaml")
+
+# 设备下拉框中的可用性标记
+_STATUS_MARK = {True: "✅", False: "❌"}
 
 from config.settings import Settings
-from audio.enhanced_device_manager import EnhancedDeviceManager
-from audio.enhanced_recorder import EnhancedAudioRecorder
-from audio.enhanced_wasapi_recorder import EnhancedWASAPIRecorder
-from audio.auto_recorder import AutoAudioRecorder
-from audio.post_processor import AudioPostProcessor
-from storage.uploader import FileUploader
-from ui.device_calibration_window import DeviceCalibrationWindow
+# 音频/上传相关模块会加载 sounddevice、numpy 等，推迟到窗口显示后在后台导入
 
 class UnifiedRecorderUI:
     def __init__(self):
@@ -23,8 +30,8 @@ class UnifiedRecorderUI:
         self.root.geometry("700x700")
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # 配置日志 - 显示INFO级别但减少频繁日志
-        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        # 日志消息队列，由 _flush_log 定时批量写入文本框
+        self._log_queue = queue.SimpleQueue()
         
         # 为后处理器创建专门的日志处理器，输出到UI
         self.setup_ui_logging()
@@ -34,28 +41,126 @@ class UnifiedRecorderUI:
         self.is_recording = False
         self.is_monitoring = False
         
-        # 初始化组件
+        # 与下拉框选项顺序一致的 (设备ID, 是否可用) 列表
+        self._mic_ids = []
+        self._system_ids = []
+        self._selected_ids = {'mic': None, 'system': None}
+        self._mic_id_to_index = {}
+        self._system_id_to_index = {}
+        self._prev_mic_sig = ()
+        self._prev_sys_sig = ()
+        self._prev_mic_idx = -1
+        self._prev_sys_idx = -1
+        
+        # 指示器当前颜色，只在变化时调用 config
+        self._ind_state = {"mic": None, "sys": None, "rec": None}
+        self._pending_indicators = None
+        self._auto_tab_visible = False
+        self.root.bind("<Map>", self._on_map)
+        
+        # 已调度的 after 任务，关闭窗口或状态切换时取消
+        self._threshold_job = None
+        self._silence_job = None
+        self._log_after_id = None
+        self._duration_after_id = None
+        self._last_duration = 0
+        
+        # 共享的后台任务线程池（设备枚举、开始/停止录制等）
+        self._exec = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recorder-ui")
+        # 窗口关闭后后台任务可能仍在运行，此标志让它们不再向已销毁的 Tk 调度回调
+        self._closing = False
+        
+        # 先加载配置并绘制界面，录音相关组件在窗口显示后再后台构建
+        self.settings = Settings(_CONFIG_PATH)
+        self.setup_console_logging()
+        self.setup_ui()
+        self._set_controls_state(False)
+        self.root.after_idle(self._init_backend)
+        
+        self._log_after_id = self.root.after(100, self._flush_log)
+    
+    def _call_ui(self, func, *args):
+        """从后台线程把 func 调度到UI线程执行；窗口关闭后直接丢弃"""
+        if self._closing:
+            return
         try:
-            config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config.yaml")
-            self.settings = Settings(config_path)
-            self.device_manager = EnhancedDeviceManager()
-            self.manual_recorder = EnhancedWASAPIRecorder(self.settings)
-            self.auto_recorder = AutoAudioRecorder(self.settings)
-            self.post_processor = AudioPostProcessor(self.settings)
-            self.post_processor.start()
-            self.uploader = FileUploader(self.settings)
-            
-            # 设置回调
-            self.manual_recorder.set_status_callback(self.on_recorder_status)
-            self.auto_recorder.set_status_callback(self.on_recorder_status)
-            
-            self.setup_ui()
-            self.load_devices()
-            self.start_status_update()
-        except Exception as e:
-            print(f"初始化错误: {e}")
-            self.setup_ui()
-            self.log_message(f"初始化错误: {e}")
+            self.root.after(0, func, *args)
+        except (tk.TclError, RuntimeError):
+            # 检查标志与销毁之间的竞争：解释器已销毁，丢弃即可
+            pass
+    
+    def _init_backend(self):
+        """在线程池中构建设备管理器、录音器等组件"""
+        self._exec.submit(self._build_backend).add_done_callback(self._on_backend_built)
+    
+    def _build_backend(self):
+        """后台构建组件；失败时抛出异常，由 _on_backend_built 交回UI线程处理"""
+        from audio.enhanced_device_manager import EnhancedDeviceManager
+        from audio.enhanced_wasapi_recorder import EnhancedWASAPIRecorder
+        from audio.auto_recorder import AutoAudioRecorder
+        from audio.post_processor import AudioPostProcessor
+        from storage.uploader import FileUploader
+        
+        # 全部构建成功后再挂到 self 上，避免失败重试时残留半初始化的组件
+        device_manager = EnhancedDeviceManager()
+        manual_recorder = EnhancedWASAPIRecorder(self.settings)
+        auto_recorder = AutoAudioRecorder(self.settings)
+        post_processor = AudioPostProcessor(self.settings)
+        uploader = FileUploader(self.settings)
+        post_processor.start()
+        
+        self.device_manager = device_manager
+        self.manual_recorder = manual_recorder
+        self.auto_recorder = auto_recorder
+        self.post_processor = post_processor
+        self.uploader = uploader
+    
+    def _on_backend_built(self, future):
+        """后台构建完成回调（运行在工作线程中），结果交回UI线程"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self._call_ui(self._wire_callbacks)
+        else:
+            self._call_ui(self._on_backend_failed, error)
+    
+    def _on_backend_failed(self, error):
+        """初始化失败：提示错误，可重试；放弃时控件保持禁用"""
+        self.log_message(f"初始化错误: {error}")
+        if messagebox.askretrycancel("初始化失败", f"录音组件初始化失败：\n{error}\n\n请检查配置和音频设备后重试。"):
+            self._init_backend()
+        else:
+            self.log_message("录音组件未初始化，修复问题后请重新启动程序")
+    
+    def _wire_callbacks(self):
+        """设置回调、启用控件并加载设备"""
+        self.manual_recorder.set_status_callback(self.on_recorder_status)
+        self.auto_recorder.set_status_callback(self.on_recorder_status)
+        self.auto_recorder.set_indicator_callback(lambda s: self._call_ui(self._apply_indicators, s))
+        
+        self._set_controls_state(True)
+        self.load_devices()
+    
+    def _set_controls_state(self, enabled):
+        """启用/禁用依赖后台组件的控件"""
+        flag = ['!disabled'] if enabled else ['disabled']
+        for widget in (self.manual_btn, self.auto_btn, self.calibrate_btn, self.refresh_btn,
+                       self.threshold_scale, self.silence_scale):
+            widget.state(flag)
+    
+    def setup_console_logging(self):
+        """配置控制台日志：级别取自配置 log_level（默认WARNING），经队列由后台线程输出"""
+        level_name = str(self.settings.config.get('log_level', 'WARNING')).upper()
+        level = getattr(logging, level_name, logging.WARNING)
+        
+        # 录音/检测线程只入队，stderr 写入由 QueueListener 线程完成
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        console_queue = queue.SimpleQueue()
+        self._log_listener = logging.handlers.QueueListener(console_queue, console_handler)
+        logging.basicConfig(level=level, handlers=[logging.handlers.QueueHandler(console_queue)])
+        self._log_listener.start()
     
     def setup_ui_logging(self):
         """设置UI日志处理器"""
@@ -68,8 +173,8 @@ class UnifiedRecorderUI:
                 try:
                     msg = self.format(record)
                     self.ui_callback(msg)
-                except:
-                    pass
+                except Exception:
+                    self.handleError(record)
         
         # 为后处理器添加UI日志处理器
         ui_handler = UILogHandler(self.log_message)
@@ -109,6 +214,11 @@ class UnifiedRecorderUI:
         self.notebook.add(self.auto_frame, text="自动录制")
         
         # 设置Tab切换回调
+        # Tab路径到模式名的映射，切换时直接查表
+        self._tab_modes = {
+            str(self.manual_frame): "手动录制",
+            str(self.auto_frame): "自动录制",
+        }
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         # 设置手动录制界面
@@ -128,12 +238,15 @@ class UnifiedRecorderUI:
         text_frame = tk.Frame(log_frame)
         text_frame.pack(fill=tk.BOTH, expand=True)
         
-        self.log_text = tk.Text(text_frame, height=15, width=70)
+        # 只读、不自动换行，追加时由 _flush_log 临时解锁
+        self.log_text = tk.Text(text_frame, height=15, width=70, state='disabled', wrap='none')
         scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.log_text.yview)
-        self.log_text.configure(yscrollcommand=scrollbar.set)
+        xscrollbar = ttk.Scrollbar(text_frame, orient="horizontal", command=self.log_text.xview)
+        self.log_text.configure(yscrollcommand=scrollbar.set, xscrollcommand=xscrollbar.set)
         
-        self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        xscrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     
     def setup_device_selection(self, parent):
         """设置共享的设备选择区域"""
@@ -147,6 +260,7 @@ class UnifiedRecorderUI:
         self.mic_var = tk.StringVar()
         self.mic_combo = ttk.Combobox(mic_frame, textvariable=self.mic_var, width=50, state="readonly")
         self.mic_combo.pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(10, 0))
+        self.mic_combo.bind('<<ComboboxSelected>>', lambda e: self._on_device_selected('mic'))
         
         # 系统音频选择
         system_frame = tk.Frame(device_frame)
@@ -155,13 +269,16 @@ class UnifiedRecorderUI:
         self.system_var = tk.StringVar()
         self.system_combo = ttk.Combobox(system_frame, textvariable=self.system_var, width=50, state="readonly")
         self.system_combo.pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(10, 0))
+        self.system_combo.bind('<<ComboboxSelected>>', lambda e: self._on_device_selected('system'))
         
         # 按钮框架
         button_frame = tk.Frame(device_frame)
         button_frame.pack(pady=(5, 0))
         
-        ttk.Button(button_frame, text="设备校准", command=self.open_calibration_window).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(button_frame, text="刷新设备", command=self.refresh_devices).pack(side=tk.LEFT)
+        self.calibrate_btn = ttk.Button(button_frame, text="设备校准", command=self.open_calibration_window)
+        self.calibrate_btn.pack(side=tk.LEFT, padx=(0, 10))
+        self.refresh_btn = ttk.Button(button_frame, text="刷新设备", command=self.refresh_devices)
+        self.refresh_btn.pack(side=tk.LEFT)
     
     def setup_call_info(self, parent):
         """设置共享的通话信息区域"""
@@ -178,6 +295,15 @@ class UnifiedRecorderUI:
         # 初始化空的客户信息变量（保持兼容性）
         self.customer_name = tk.StringVar()
         self.customer_id = tk.StringVar()
+        
+        # 通过 trace 同步到普通属性，热路径读取时无需再调用 StringVar.get()
+        self._agent_phone_val = ""
+        self._customer_name_val = ""
+        self._customer_id_val = ""
+        for var, attr in ((self.agent_phone, '_agent_phone_val'),
+                          (self.customer_name, '_customer_name_val'),
+                          (self.customer_id, '_customer_id_val')):
+            var.trace_add("write", lambda *a, v=var, name=attr: setattr(self, name, v.get()))
     
     def setup_manual_ui(self):
         """设置手动录制界面"""
@@ -208,9 +334,9 @@ class UnifiedRecorderUI:
         threshold_frame.pack(fill=tk.X, pady=2)
         ttk.Label(threshold_frame, text="音量阈值:").pack(side=tk.LEFT)
         self.threshold_var = tk.DoubleVar(value=self.settings.auto_recording.get('volume_threshold', 0.015))
-        threshold_scale = ttk.Scale(threshold_frame, from_=0.005, to=0.1, variable=self.threshold_var, 
+        self.threshold_scale = ttk.Scale(threshold_frame, from_=0.005, to=0.1, variable=self.threshold_var, 
                                   orient=tk.HORIZONTAL, command=self.on_threshold_changed)
-        threshold_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 10))
+        self.threshold_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 10))
         self.threshold_label = ttk.Label(threshold_frame, text=f"{self.threshold_var.get():.3f}")
         self.threshold_label.pack(side=tk.RIGHT)
         
@@ -219,9 +345,9 @@ class UnifiedRecorderUI:
         silence_frame.pack(fill=tk.X, pady=2)
         ttk.Label(silence_frame, text="静默时长(秒):").pack(side=tk.LEFT)
         self.silence_var = tk.DoubleVar(value=self.settings.auto_recording.get('end_silence_duration', 12.0))
-        silence_scale = ttk.Scale(silence_frame, from_=5.0, to=30.0, variable=self.silence_var,
+        self.silence_scale = ttk.Scale(silence_frame, from_=5.0, to=30.0, variable=self.silence_var,
                                 orient=tk.HORIZONTAL, command=self.on_silence_changed)
-        silence_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 10))
+        self.silence_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 10))
         self.silence_label = ttk.Label(silence_frame, text=f"{self.silence_var.get():.1f}s")
         self.silence_label.pack(side=tk.RIGHT)
         
@@ -264,118 +390,164 @@ class UnifiedRecorderUI:
     
     def on_tab_changed(self, event):
         """处理Tab切换事件"""
-        selected_tab = self.notebook.index(self.notebook.select())
-        if selected_tab == 0:
-            self.log_message("切换到手动录制模式")
-        else:
-            self.log_message("切换到自动录制模式")
+        mode = self._tab_modes.get(self.notebook.select(), "自动录制")
+        self.log_message(f"切换到{mode}模式")
+        self._auto_tab_visible = mode == "自动录制"
+        if self._auto_tab_visible and self._pending_indicators is not None:
+            self._apply_indicators(self._pending_indicators)
+    
+    def load_devices(self, rescan=False):
+        """加载设备列表（在线程池中枚举，避免阻塞UI）；rescan 为 True 时先重新扫描设备"""
+        # 枚举期间禁用刷新按钮，避免重复提交
+        self.refresh_btn.state(['disabled'])
+        # 记住当前选中项，列表未变化时按索引恢复
+        self._prev_mic_idx = self.mic_combo.current()
+        self._prev_sys_idx = self.system_combo.current()
+        self.mic_var.set("刷新中...")
+        self.system_var.set("刷新中...")
+        self._selected_ids = {'mic': None, 'system': None}
+        self._exec.submit(self._enumerate_devices_bg, rescan)
     
-    def load_devices(self):
-        """加载设备列表"""
+    def _enumerate_devices_bg(self, rescan=False):
+        """后台枚举设备，结果通过 root.after 回到UI线程"""
         try:
-            recommendations = self.device_manager.get_recommended_devices()
-            
-            # 加载麦克风设备
-            physical_mics = self.device_manager.get_physical_microphones()
-            mic_options = []
-            for device_id, device in physical_mics:
-                available = self.device_manager.test_device_availability(device_id)
-                status = "✅" if available else "❌"
-                mic_options.append(f"{status} [{device_id}] {device['name']}")
-            
-            # 加载系统音频设备（优先仅显示 WASAPI loopback；无则回退到旧逻辑）
-            system_options = []
-            used_pyaudio = False
-            default_idx = None
-            try:
-                import platform
-                if platform.system() == 'Windows':
+            if rescan:
+                self.device_manager.rescan()
+            result = self._enumerate_devices()
+            self._call_ui(self._apply_devices, *result)
+        except Exception as e:
+            self.log_message(f"设备加载失败: {e}")
+        finally:
+            self._call_ui(self.refresh_btn.state, ['!disabled'])
+    
+    def _enumerate_devices(self):
+        """枚举设备并测试可用性，不访问任何Tk控件
+        
+        返回 (mic_options, system_options, recommendations, mic_ids, system_ids)
+        """
+        # 先在枚举线程中依次探测全部输入设备（串行，见 _probe_devices），推荐逻辑和下方列表直接命中缓存
+        self._probe_devices([device_id for device_id, _ in self.device_manager.get_input_devices()])
+        recommendations = self.device_manager.get_recommended_devices()
+        
+        # 加载麦克风设备
+        physical_mics = self.device_manager.get_physical_microphones()
+        mic_avail = self._probe_devices([device_id for device_id, _ in physical_mics])
+        mic_options = [f"{_STATUS_MARK[available]} [{device_id}] {device['name']}"
+                       for (device_id, device), available in zip(physical_mics, mic_avail)]
+        mic_ids = [(device_id, available) for (device_id, _), available in zip(physical_mics, mic_avail)]
+        
+        # 加载系统音频设备（优先仅显示 WASAPI loopback；无则回退到旧逻辑）
+        system_options = []
+        system_ids = []
+        used_pyaudio = False
+        default_idx = None
+        try:
+            import platform
+            if platform.system() == 'Windows':
+                try:
+                    import pyaudiowpatch as pyaudio
+                    self.log_message("尝试使用 PyAudioWPatch 枚举 WASAPI loopback 设备...")
+                    p = pyaudio.PyAudio()
+                    default_loop = None
                     try:
-                        import pyaudiowpatch as pyaudio
-                        self.log_message("尝试使用 PyAudioWPatch 枚举 WASAPI loopback 设备...")
-                        p = pyaudio.PyAudio()
+                        default_loop = p.get_default_wasapi_loopback()
+                    except Exception:
                         default_loop = None
-                        try:
-                            default_loop = p.get_default_wasapi_loopback()
-                        except Exception:
-                            default_loop = None
-                        default_idx = default_loop.get('index') if default_loop else None
+                    default_idx = default_loop.get('index') if default_loop else None
 
-                        # 先加入默认环回（若可用），避免扫描失败导致列表为空
-                        if default_loop and default_loop.get('maxInputChannels', 0) > 0:
-                            name = default_loop.get('name', 'Default WASAPI Loopback')
-                            system_options.append(f"✅ [PA:{default_idx}] {name}")
+                    # 先加入默认环回（若可用），避免扫描失败导致列表为空
+                    if default_loop and default_loop.get('maxInputChannels', 0) > 0:
+                        name = default_loop.get('name', 'Default WASAPI Loopback')
+                        system_options.append(f"✅ [PA:{default_idx}] {name}")
+                        system_ids.append((f"PA:{default_idx}", True))
 
-                        # 枚举所有 loopback 设备（兼容不同键名：isLoopbackDevice / isLoopback）
-                        for i in range(p.get_device_count()):
-                            info = p.get_device_info_by_index(i)
-                            is_lb = info.get('isLoopbackDevice')
-                            if is_lb is None:
-                                is_lb = info.get('isLoopback')
-                            if is_lb and info.get('maxInputChannels', 0) > 0:
-                                name = info.get('name', f'Device {i}')
-                                entry = f"✅ [PA:{i}] {name}"
-                                if f"[PA:{i}]" not in entry:
-                                    pass
-                                # 去重：避免与默认环回重复
-                                if not any(f"[PA:{i}]" in opt for opt in system_options):
-                                    system_options.append(entry)
-                        used_pyaudio = len(system_options) > 0
-                        self.log_message(f"PyAudio 枚举 loopback 数量: {len(system_options)}")
-                        try:
-                            p.terminate()
-                        except Exception:
-                            pass
+                    # 枚举所有 loopback 设备（兼容不同键名：isLoopbackDevice / isLoopback）
+                    for i in range(p.get_device_count()):
+                        info = p.get_device_info_by_index(i)
+                        is_lb = info.get('isLoopbackDevice')
+                        if is_lb is None:
+                            is_lb = info.get('isLoopback')
+                        if is_lb and info.get('maxInputChannels', 0) > 0:
+                            name = info.get('name', f'Device {i}')
+                            entry = f"✅ [PA:{i}] {name}"
+                            # 去重：避免与默认环回重复
+                            if (f"PA:{i}", True) not in system_ids:
+                                system_options.append(entry)
+                                system_ids.append((f"PA:{i}", True))
+                    used_pyaudio = len(system_options) > 0
+                    self.log_message(f"PyAudio 枚举 loopback 数量: {len(system_options)}")
+                    try:
+                        p.terminate()
                     except Exception:
-                        used_pyaudio = False
-                        self.log_message("PyAudioWPatch 导入或枚举失败，回退到旧设备列表")
-            except Exception:
-                used_pyaudio = False
+                        pass
+                except Exception:
+                    used_pyaudio = False
+                    self.log_message("PyAudioWPatch 导入或枚举失败，回退到旧设备列表")
+        except Exception:
+            used_pyaudio = False
 
-            if not used_pyaudio:
-                # 回退到原有基于 sounddevice 的设备列表（立体声混音/虚拟设备）
-                loopback_devices = self.device_manager.get_loopback_devices()
-                self.log_message(f"sounddevice 回退设备数: {len(loopback_devices)}")
-                for device_id, device in loopback_devices:
-                    available = self.device_manager.test_device_availability(device_id)
-                    status = "✅" if available else "❌"
-                    system_options.append(f"{status} [{device_id}] {device['name']}")
-            
-            # 更新共享的设备列表
-            self.mic_combo['values'] = mic_options
-            self.system_combo['values'] = system_options
-            
-            # 自动选择推荐设备
-            if recommendations['microphone'] is not None:
-                for i, option in enumerate(mic_options):
-                    if f"[{recommendations['microphone']}]" in option:
-                        self.mic_combo.current(i)
-                        break
-            
-            # 选择项：
-            # - 有 PyAudio loopback 时：仅显示它们，且默认选中 OS 默认输出的环回（若能识别），否则第一项
-            # - 无 PyAudio loopback：回退到旧逻辑，按推荐项选择
-            if system_options and used_pyaudio:
-                selected_index = 0
-                if default_idx is not None:
-                    for i, option in enumerate(system_options):
-                        if f"[PA:{default_idx}]" in option:
-                            selected_index = i
-                            break
-                self.system_combo.current(selected_index)
-            elif system_options and recommendations['system_audio'] is not None:
-                for i, option in enumerate(system_options):
-                    if f"[{recommendations['system_audio']}]" in option:
-                        self.system_combo.current(i)
-                        break
-            elif system_options:
-                # 至少选中第一项（例如我们加入的占位项）
-                self.system_combo.current(0)
-            
-            self.log_message(f"设备加载完成 - 麦克风:{len(mic_options)}个, 系统音频:{len(system_options)}个")
-            
-        except Exception as e:
-            self.log_message(f"设备加载失败: {e}")
+        if used_pyaudio:
+            # 有 PyAudio loopback 时：默认选中 OS 默认输出的环回（若能识别），否则第一项
+            recommendations = dict(recommendations)
+            recommendations['system_audio'] = f"PA:{default_idx}" if default_idx is not None else None
+        else:
+            # 回退到原有基于 sounddevice 的设备列表（立体声混音/虚拟设备）
+            loopback_devices = self.device_manager.get_loopback_devices()
+            self.log_message(f"sounddevice 回退设备数: {len(loopback_devices)}")
+            loopback_avail = self._probe_devices([device_id for device_id, _ in loopback_devices])
+            system_options.extend(f"{_STATUS_MARK[available]} [{device_id}] {device['name']}"
+                                  for (device_id, device), available in zip(loopback_devices, loopback_avail))
+            system_ids.extend((device_id, available) for (device_id, _), available in zip(loopback_devices, loopback_avail))
+        
+        # 选项以元组返回，_apply_devices 可直接用作签名和 values
+        return tuple(mic_options), tuple(system_options), recommendations, mic_ids, system_ids
+    
+    def _probe_devices(self, device_ids):
+        """依次测试设备可用性（在后台线程中调用）
+        
+        PortAudio 不保证并发打开/关闭流是线程安全的，探测只在当前后台线程中串行进行，UI 线程不受影响
+        """
+        return [self.device_manager.test_device_availability(device_id) for device_id in device_ids]
+    
+    def _apply_devices(self, mic_options, system_options, recommendations, mic_ids, system_ids):
+        """在UI线程中更新设备下拉框"""
+        self.mic_var.set("")
+        self.system_var.set("")
+        self._mic_ids = mic_ids
+        self._system_ids = system_ids
+        self._mic_id_to_index = {device_id: i for i, (device_id, _) in enumerate(mic_ids)}
+        self._system_id_to_index = {device_id: i for i, (device_id, _) in enumerate(system_ids)}
+        
+        # 设备列表未变化时不重新设置values，并保留原选中项
+        mic_sig = mic_options
+        if mic_sig != self._prev_mic_sig:
+            self.mic_combo['values'] = mic_sig
+            self._prev_mic_sig = mic_sig
+        elif 0 <= self._prev_mic_idx < len(mic_sig):
+            self.mic_combo.current(self._prev_mic_idx)
+        
+        sys_sig = system_options
+        if sys_sig != self._prev_sys_sig:
+            self.system_combo['values'] = sys_sig
+            self._prev_sys_sig = sys_sig
+        elif 0 <= self._prev_sys_idx < len(sys_sig):
+            self.system_combo.current(self._prev_sys_idx)
+        
+        # 自动选择推荐设备
+        if self.mic_combo.current() < 0:
+            idx = self._mic_id_to_index.get(recommendations['microphone'])
+            if idx is not None:
+                self.mic_combo.current(idx)
+        
+        # 按推荐项选择系统音频；未命中时至少选中第一项
+        if system_options and self.system_combo.current() < 0:
+            self.system_combo.current(self._system_id_to_index.get(recommendations['system_audio'], 0))
+        
+        # 代码设置选中项不会触发 <<ComboboxSelected>>，手动同步缓存
+        self._on_device_selected('mic')
+        self._on_device_selected('system')
+        
+        self.log_message(f"设备加载完成 - 麦克风:{len(mic_options)}个, 系统音频:{len(system_options)}个")
     
     def open_calibration_window(self):
         """打开设备校准窗口"""
@@ -383,26 +555,28 @@ class UnifiedRecorderUI:
             """校准完成回调"""
             if mic_id is not None:
                 # 在麦克风列表中选择校准结果
-                for i, option in enumerate(self.mic_combo['values']):
-                    if f"[{mic_id}]" in option:
-                        self.mic_combo.current(i)
-                        break
+                idx = self._mic_id_to_index.get(mic_id)
+                if idx is not None:
+                    self.mic_combo.current(idx)
+                    self._on_device_selected('mic')
                 self.log_message(f"已选择麦克风设备: {mic_id}")
             
             if system_id is not None:
                 # 在系统音频列表中选择校准结果
-                for i, option in enumerate(self.system_combo['values']):
-                    if f"[{system_id}]" in option:
-                        self.system_combo.current(i)
-                        break
+                idx = self._system_id_to_index.get(system_id)
+                if idx is not None:
+                    self.system_combo.current(idx)
+                    self._on_device_selected('system')
                 self.log_message(f"已选择系统音频设备: {system_id}")
         
         try:
+            from ui.device_calibration_window import DeviceCalibrationWindow
+            
             # 获取主窗口的设备列表
-            mic_devices = [(self.get_selected_device_id(option), {'name': option.split('] ')[1] if '] ' in option else option}) 
-                          for option in self.mic_combo['values'] if '✅' in option]
-            system_devices = [(self.get_selected_device_id(option), {'name': option.split('] ')[1] if '] ' in option else option}) 
-                             for option in self.system_combo['values'] if '✅' in option]
+            mic_devices = [(device_id, {'name': option.split('] ', 1)[-1]})
+                           for option, (device_id, available) in zip(self.mic_combo['values'], self._mic_ids) if available]
+            system_devices = [(device_id, {'name': option.split('] ', 1)[-1]})
+                              for option, (device_id, available) in zip(self.system_combo['values'], self._system_ids) if available]
             
             DeviceCalibrationWindow(self.root, mic_devices, system_devices, on_calibration_complete)
         except Exception as e:
@@ -411,21 +585,23 @@ class UnifiedRecorderUI:
     def refresh_devices(self):
         """刷新设备列表"""
         self.log_message("正在刷新设备列表...")
-        self.device_manager = EnhancedDeviceManager()
-        self.load_devices()
+        self.load_devices(rescan=True)
     
-    def get_selected_device_id(self, combo_value):
-        """从组合框值中提取设备ID"""
-        if not combo_value or "❌" in combo_value:
-            return None
-        try:
-            raw = combo_value.split(']')[0].split('[')[1]
-            if raw.startswith('PA:'):
-                # 以字符串形式返回 PyAudio 设备，供 recorder 识别
-                return f"{raw}"
-            return int(raw)
-        except:
-            return None
+    def _on_device_selected(self, which):
+        """缓存下拉框当前选中的设备ID（'mic' 或 'system'），不可用时记为None"""
+        if which == 'mic':
+            combo, ids = self.mic_combo, self._mic_ids
+        else:
+            combo, ids = self.system_combo, self._system_ids
+        idx = combo.current()
+        self._selected_ids[which] = ids[idx][0] if 0 <= idx < len(ids) and ids[idx][1] else None
+    
+    def get_selected_device_id(self, which):
+        """获取已缓存的选中设备ID（'mic' 或 'system'），不可用时返回None
+        
+        PyAudio 设备以 "PA:idx" 字符串形式返回，供 recorder 识别
+        """
+        return self._selected_ids[which]
     
     def toggle_manual_recording(self):
         """切换手动录制状态"""
@@ -444,12 +620,12 @@ class UnifiedRecorderUI:
     def start_manual_recording(self):
         """开始手动录制"""
         # 校验坐席手机号
-        if not self.agent_phone.get().strip():
+        if not self._agent_phone_val.strip():
             messagebox.showerror("错误", "请填写坐席手机号")
             return
         
-        mic_id = self.get_selected_device_id(self.mic_var.get())
-        system_id = self.get_selected_device_id(self.system_var.get())
+        mic_id = self.get_selected_device_id('mic')
+        system_id = self.get_selected_device_id('system')
         
         if mic_id is None:
             messagebox.showerror("错误", "请选择可用的麦克风设备")
@@ -459,37 +635,46 @@ class UnifiedRecorderUI:
             if not messagebox.askyesno("确认", "未选择系统音频设备，将只录制麦克风。是否继续？"):
                 return
         
+        # 通话信息和文件名在开始时确定，停止时录制器直接按最终文件名写入
+        self._manual_call_info = {
+            'agent_phone': self._agent_phone_val,
+            'customer_name': self._customer_name_val,
+            'customer_id': self._customer_id_val
+        }
+        self._manual_basename = self._build_base_filename(self._manual_call_info)
+        
         def record_thread():
             if self.manual_recorder.start_recording(mic_id, system_id):
+                self._rec_start = time.monotonic()
                 self.is_recording = True
-                self.root.after(0, self.update_manual_ui, True)
-                self.root.after(0, self.start_duration_timer)
+                self._call_ui(self.update_manual_ui, True)
+                self._call_ui(self.start_duration_timer)
             else:
-                self.root.after(0, messagebox.showerror, "错误", "无法开始录音")
+                self._call_ui(messagebox.showerror, "错误", "无法开始录音")
         
-        threading.Thread(target=record_thread, daemon=True).start()
+        self._exec.submit(record_thread)
     
     def stop_manual_recording(self):
         """停止手动录制"""
         def stop_thread():
-            result = self.manual_recorder.stop_recording()
+            result = self.manual_recorder.stop_recording(out_basename=self._manual_basename)
             self.is_recording = False
-            self.root.after(0, self.update_manual_ui, False)
+            self._call_ui(self.update_manual_ui, False)
             
             if result:
-                self.root.after(0, self.process_recording_result, result)
+                self.process_recording_result(result)
         
-        threading.Thread(target=stop_thread, daemon=True).start()
+        self._exec.submit(stop_thread)
     
     def start_auto_monitoring(self):
         """开始自动监听"""
         # 校验坐席手机号
-        if not self.agent_phone.get().strip():
+        if not self._agent_phone_val.strip():
             messagebox.showerror("错误", "请填写坐席手机号")
             return
         
-        mic_id = self.get_selected_device_id(self.mic_var.get())
-        system_id = self.get_selected_device_id(self.system_var.get())
+        mic_id = self.get_selected_device_id('mic')
+        system_id = self.get_selected_device_id('system')
         
         if mic_id is None:
             messagebox.showerror("错误", "请选择可用的麦克风设备")
@@ -502,28 +687,28 @@ class UnifiedRecorderUI:
         # 设置设备和通话信息
         self.auto_recorder.set_devices(mic_id, system_id)
         self.auto_recorder.set_call_info(
-            self.agent_phone.get(),
-            self.customer_name.get(),
-            self.customer_id.get()
+            self._agent_phone_val,
+            self._customer_name_val,
+            self._customer_id_val
         )
         
         def monitor_thread():
             if self.auto_recorder.start_monitoring():
                 self.is_monitoring = True
-                self.root.after(0, self.update_auto_ui, True)
+                self._call_ui(self.update_auto_ui, True)
             else:
-                self.root.after(0, messagebox.showerror, "错误", "无法开始监听")
+                self._call_ui(messagebox.showerror, "错误", "无法开始监听")
         
-        threading.Thread(target=monitor_thread, daemon=True).start()
+        self._exec.submit(monitor_thread)
     
     def stop_auto_monitoring(self):
         """停止自动监听"""
         def stop_thread():
             self.auto_recorder.stop_monitoring()
             self.is_monitoring = False
-            self.root.after(0, self.update_auto_ui, False)
+            self._call_ui(self.update_auto_ui, False)
         
-        threading.Thread(target=stop_thread, daemon=True).start()
+        self._exec.submit(stop_thread)
     
     def update_manual_ui(self, recording):
         """更新手动录制UI"""
@@ -536,6 +721,10 @@ class UnifiedRecorderUI:
             self.manual_status_var.set("就绪")
             self.manual_status_label.config(foreground="green")
             self.duration_var.set("00:00")
+            self._last_duration = 0
+            if self._duration_after_id:
+                self.root.after_cancel(self._duration_after_id)
+                self._duration_after_id = None
     
     def update_auto_ui(self, monitoring):
         """更新自动录制UI"""
@@ -548,132 +737,172 @@ class UnifiedRecorderUI:
             self.auto_status_var.set("就绪")
             self.auto_status_label.config(foreground="green")
     
-    def start_status_update(self):
-        """开始状态更新循环"""
-        self.update_status_indicators()
-        self.root.after(2000, self.start_status_update)  # 减少更新频率从500ms到2s
+    def _on_map(self, event):
+        """窗口恢复显示时应用最小化期间的指示器状态"""
+        if event.widget is self.root and self._pending_indicators is not None:
+            self._apply_indicators(self._pending_indicators)
     
-    def update_status_indicators(self):
-        """更新状态指示器"""
-        try:
-            # 只在自动录制Tab且正在监听时更新指示器
-            current_tab = self.notebook.index(self.notebook.select())
-            if current_tab == 1 and self.is_monitoring:  # 自动录制Tab
-                status = self.auto_recorder.get_status()
-                
-                # 更新指示器（减少频率，避免过多日志）
-                self.mic_indicator.config(fg="green" if status.get('mic_active', False) else "gray")
-                self.system_indicator.config(fg="green" if status.get('system_active', False) else "gray")
-                
-                if status.get('state') == 'recording':
-                    self.record_indicator.config(fg="red")
-                elif status.get('monitoring', False):
-                    self.record_indicator.config(fg="orange")
-                else:
-                    self.record_indicator.config(fg="gray")
-            else:
-                # 重置指示器
-                self.mic_indicator.config(fg="gray")
-                self.system_indicator.config(fg="gray")
-                self.record_indicator.config(fg="gray")
-        except:
-            pass
+    def _set_ind(self, key, widget, color):
+        """设置指示器颜色，颜色未变化时跳过"""
+        if self._ind_state[key] != color:
+            widget.config(fg=color)
+            self._ind_state[key] = color
+    
+    def _apply_indicators(self, status):
+        """根据自动录制器推送的状态更新指示器（自动Tab不可见或窗口最小化时暂存，显示后再应用）"""
+        if not self._auto_tab_visible or self.root.state() == 'iconic':
+            self._pending_indicators = status
+            return
+        self._pending_indicators = None
+        self._set_ind("mic", self.mic_indicator, "green" if status.get('mic_active', False) else "gray")
+        self._set_ind("sys", self.system_indicator, "green" if status.get('system_active', False) else "gray")
+        
+        if status.get('state') == 'recording':
+            self._set_ind("rec", self.record_indicator, "red")
+        elif status.get('monitoring', False):
+            self._set_ind("rec", self.record_indicator, "orange")
+        else:
+            self._set_ind("rec", self.record_indicator, "gray")
     
     def start_duration_timer(self):
         """开始时长计时器"""
         if self.is_recording:
-            status = self.manual_recorder.get_recording_status()
-            if status['recording']:
-                duration = int(status['duration'])
+            elapsed = time.monotonic() - self._rec_start
+            duration = int(elapsed)
+            # 秒数变化时才写入 StringVar
+            if duration != self._last_duration:
+                self._last_duration = duration
                 minutes = duration // 60
                 seconds = duration % 60
                 self.duration_var.set(f"{minutes:02d}:{seconds:02d}")
             
-            self.root.after(1000, self.start_duration_timer)
+            # 对齐到下一个整秒，避免计时漂移
+            delay = max(1, int((duration + 1 - elapsed) * 1000))
+            self._duration_after_id = self.root.after(delay, self.start_duration_timer)
     
-    def process_recording_result(self, result):
-        """处理录制结果"""
-        # 生成文件名并重命名
+    def _build_base_filename(self, call_info):
+        """根据当前时间和通话信息生成录音文件名（不含前缀和扩展名）"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename_parts = [timestamp]
         
-        # 使用手动录制Tab的变量
-        if self.agent_phone.get():
-            filename_parts.extend(['Agent', self.agent_phone.get()])
-        if self.customer_name.get():
-            filename_parts.extend(['Customer', self.customer_name.get()])
-        if self.customer_id.get():
-            filename_parts.extend(['ID', self.customer_id.get()])
-        
-        base_filename = '_'.join(filename_parts)
-        
-        if result['mic_success'] and result['mic_file']:
-            new_mic_file = os.path.join(os.path.dirname(result['mic_file']), f"mic_{base_filename}.wav")
-            os.rename(result['mic_file'], new_mic_file)
-            self.log_message(f"✅ 麦克风文件: {os.path.basename(new_mic_file)}")
-        
-        if result['speaker_success'] and result['speaker_file']:
-            new_system_file = os.path.join(os.path.dirname(result['speaker_file']), f"system_{base_filename}.wav")
-            os.rename(result['speaker_file'], new_system_file)
-            self.log_message(f"✅ 系统音频文件: {os.path.basename(new_system_file)}")
-        
-        self.log_message(f"录音完成! 时长: {result['duration']:.2f} 秒")
+        agent = call_info['agent_phone']
+        customer = call_info['customer_name']
+        cid = call_info['customer_id']
+        if agent:
+            filename_parts.extend(['Agent', agent])
+        if customer:
+            filename_parts.extend(['Customer', customer])
+        if cid:
+            filename_parts.extend(['ID', cid])
+        
+        return '_'.join(filename_parts)
+    
+    def process_recording_result(self, result):
+        """处理录制结果（在后台线程调用，不访问Tk控件）"""
+        mic_file = result['mic_file'] if result['mic_success'] else None
+        system_file = result['speaker_file'] if result['speaker_success'] else None
+        
+        # 日志合并为一条入队
+        lines = []
+        if mic_file:
+            lines.append(f"✅ 麦克风文件: {os.path.basename(mic_file)}")
+        if system_file:
+            lines.append(f"✅ 系统音频文件: {os.path.basename(system_file)}")
+        lines.append(f"录音完成! 时长: {result['duration']:.2f} 秒")
         
         # 提交后处理
-        if result['mic_success'] or result['speaker_success']:
-            call_info = {
-                'agent_phone': self.agent_phone.get(),
-                'customer_name': self.customer_name.get(),
-                'customer_id': self.customer_id.get()
-            }
-            self.log_message("提交后处理...")
-            
-            # 使用重命名后的文件路径
-            mic_file = new_mic_file if result['mic_success'] and result['mic_file'] else None
-            system_file = new_system_file if result['speaker_success'] and result['speaker_file'] else None
-            
-            self.post_processor.submit_recording(mic_file, system_file, call_info)
+        submit = result['mic_success'] or result['speaker_success']
+        if submit:
+            lines.append("提交后处理...")
+        self.log_message("\n".join(lines))
+        
+        if submit:
+            # 与文件名使用同一份开始录音时的通话信息
+            self.post_processor.submit_recording(mic_file, system_file, self._manual_call_info)
+    
+    def _debounce_config(self, job_attr, key, value):
+        """拖动滑块时只在停止100ms后才把最终值应用到录制器"""
+        job = getattr(self, job_attr)
+        if job:
+            self.root.after_cancel(job)
+        setattr(self, job_attr, self.root.after(100, self.auto_recorder.update_config, key, value))
     
     def on_threshold_changed(self, value):
         """音量阈值改变"""
         threshold = float(value)
         self.threshold_label.config(text=f"{threshold:.3f}")
-        self.auto_recorder.update_config('volume_threshold', threshold)
+        self._debounce_config('_threshold_job', 'volume_threshold', threshold)
     
     def on_silence_changed(self, value):
         """静默时长改变"""
         silence = float(value)
         self.silence_label.config(text=f"{silence:.1f}s")
-        self.auto_recorder.update_config('end_silence_duration', silence)
+        self._debounce_config('_silence_job', 'end_silence_duration', silence)
     
     def upload_callback(self, success, message):
         """上传回调函数"""
-        self.root.after(0, self.log_message, message)
+        self.log_message(message)
     
     def on_recorder_status(self, message):
         """录制器状态回调"""
-        self.root.after(0, self.log_message, message)
+        self.log_message(message)
     
     def log_message(self, message):
-        """记录日志消息"""
-        try:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-            self.log_text.see(tk.END)
-        except:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+        """记录日志消息（线程安全：只入队，由 _flush_log 批量写入并加时间戳）"""
+        self._log_queue.put(message)
+    
+    def _flush_log(self):
+        """每100ms将队列中的日志一次性写入文本框"""
+        items = []
+        while len(items) < 500:
+            try:
+                items.append(self._log_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        if items:
+            # 每批只格式化一次时间戳
+            prefix = time.strftime("[%H:%M:%S] ")
+            # 多行消息的每一行都加时间戳
+            payload = "".join(prefix + item.replace("\n", "\n" + prefix) + "\n" for item in items)
+            try:
+                self.log_text.config(state='normal')
+                self.log_text.insert(tk.END, payload)
+                # 限制日志行数，避免文本框无限增长
+                line_count = int(self.log_text.index('end-1c').split('.')[0])
+                if line_count > 5000:
+                    self.log_text.delete('1.0', f'{line_count - 5000 + 1}.0')
+                self.log_text.config(state='disabled')
+                self.log_text.see(tk.END)
+            except tk.TclError:
+                # 文本框已销毁时退回到控制台输出
+                print(payload, end="")
+        
+        self._log_after_id = self.root.after(100, self._flush_log)
     
     def on_closing(self):
         """窗口关闭事件处理"""
         if self.is_recording or self.is_monitoring:
-            if messagebox.askokcancel("退出", "正在录音/监听中，确定要退出吗？"):
-                if hasattr(self, 'post_processor'):
-                    self.post_processor.stop()
-                self.root.destroy()
-        else:
-            if hasattr(self, 'post_processor'):
-                self.post_processor.stop()
-            self.root.destroy()
+            if not messagebox.askokcancel("退出", "正在录音/监听中，确定要退出吗？"):
+                return
+        
+        # 之后完成的后台任务（如停止/保存）不再向UI调度回调
+        self._closing = True
+        
+        # 取消所有已调度的回调，避免窗口销毁后仍被触发
+        for job in (self._log_after_id, self._duration_after_id, self._threshold_job, self._silence_job):
+            if job:
+                self.root.after_cancel(job)
+        
+        # 断开录音器推送，避免后台线程在窗口销毁后继续调度回调
+        if hasattr(self, 'auto_recorder'):
+            self.auto_recorder.set_indicator_callback(None)
+        
+        self._exec.shutdown(wait=False)
+        if hasattr(self, 'post_processor'):
+            self.post_processor.stop()
+        self._log_listener.stop()
+        self.root.destroy()
     
     def run(self):
         self.root.mainloop()
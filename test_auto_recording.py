@@ -7,11 +7,12 @@ import sys
 import os
 import time
 import logging
+import threading
 
 # 添加src目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from config.settings import Settings
+from config.settings import load_settings
 from audio.auto_recorder import AutoAudioRecorder
 from audio.enhanced_device_manager import EnhancedDeviceManager
 
@@ -25,7 +26,7 @@ def test_auto_recording():
     try:
         # 初始化组件
         config_path = "config.yaml"
-        settings = Settings(config_path)
+        settings = load_settings(config_path)
         device_manager = EnhancedDeviceManager()
         auto_recorder = AutoAudioRecorder(settings)
         
@@ -35,6 +36,16 @@ def test_auto_recording():
         
         auto_recorder.set_status_callback(status_callback)
         
+        # 指示器状态变化时由录制器推送，主线程只在变化时被唤醒
+        state_changed = threading.Event()
+        last_status = {}
+        
+        def indicator_callback(status):
+            last_status.update(status)
+            state_changed.set()
+        
+        auto_recorder.set_indicator_callback(indicator_callback)
+        
         # 获取推荐设备
         recommendations = device_manager.get_recommended_devices()
         mic_device = recommendations['microphone']
@@ -62,13 +73,15 @@ def test_auto_recording():
         
         # 监听30秒
         logger.info("监听30秒，请说话测试...")
-        for i in range(30):
-            time.sleep(1)
-            status = auto_recorder.get_status()
-            
-            if i % 5 == 0:  # 每5秒输出一次状态
-                logger.info(f"状态: {status['state']}, 麦克风活跃: {status.get('mic_active', False)}, "
-                          f"系统音频活跃: {status.get('system_active', False)}")
+        deadline = time.monotonic() + 30
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if state_changed.wait(timeout=min(5, remaining)):
+                state_changed.clear()
+                logger.info(f"状态: {last_status.get('state')}, 麦克风活跃: {last_status.get('mic_active', False)}, "
+                          f"系统音频活跃: {last_status.get('system_active', False)}")
         
         # 停止监听
         logger.info("停止监听...")
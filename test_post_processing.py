@@ -4,42 +4,59 @@
 import os
 import sys
 import numpy as np
-import wave
-import time
+import struct
+import logging
+import threading
+from concurrent.futures import wait
 from datetime import datetime
 
 # 添加src目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from config.settings import Settings
+from config.settings import load_settings
 from audio.post_processor import AudioPostProcessor
 
+logger = logging.getLogger(__name__)
+
+def write_wav_raw(filename, pcm_int16, sample_rate, channels=1):
+    """直接写出44字节WAV头和PCM数据（绕过 wave 模块和Python缓冲层）"""
+    data_size = pcm_int16.nbytes
+    header = struct.pack('<4sI4s4sIHHIIHH4sI',
+                         b'RIFF', 36 + data_size, b'WAVE',
+                         b'fmt ', 16, 1, channels, sample_rate,
+                         sample_rate * channels * 2, channels * 2, 16,
+                         b'data', data_size)
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0))
+    try:
+        os.write(fd, header)
+        view = memoryview(pcm_int16).cast('B')
+        # os.write 可能只写入部分数据，循环直到写完
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 def create_test_audio(filename, duration=10, sample_rate=44100, frequency=440, amplitude=0.5):
     """创建测试音频文件"""
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    audio_data = amplitude * np.sin(2 * np.pi * frequency * t)
+    n = int(sample_rate * duration)
+    # float32 单缓冲区原地计算：相位 -> 正弦 -> 缩放
+    audio_data = np.arange(n, dtype=np.float32)
+    audio_data *= np.float32(2 * np.pi * frequency / sample_rate)
+    np.sin(audio_data, out=audio_data)
+    audio_data *= np.float32(amplitude * 32767)
     
     # 转换为int16
-    audio_int16 = (audio_data * 32767).astype(np.int16)
+    audio_int16 = audio_data.astype(np.int16)
     
-    with wave.open(filename, 'wb') as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sample_rate)
-        wf.writeframes(audio_int16.tobytes())
+    write_wav_raw(filename, audio_int16, sample_rate)
     
     print(f"创建测试音频: {filename}")
 
 def create_silent_audio(filename, duration=10, sample_rate=44100):
     """创建静音测试文件"""
-    audio_data = np.zeros(int(sample_rate * duration), dtype=np.float32)
-    audio_int16 = (audio_data * 32767).astype(np.int16)
+    audio_int16 = np.zeros(int(sample_rate * duration), dtype=np.int16)
     
-    with wave.open(filename, 'wb') as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sample_rate)
-        wf.writeframes(audio_int16.tobytes())
+    write_wav_raw(filename, audio_int16, sample_rate)
     
     print(f"创建静音音频: {filename}")
 
@@ -48,8 +65,22 @@ def test_post_processing():
     print("=== 测试音频后处理功能 ===")
     
     # 初始化设置和后处理器
-    settings = Settings("config.yaml")
+    settings = load_settings("config.yaml")
+    # 输出目录平时由录音器创建，单独测试后处理时需自行创建
+    os.makedirs(settings.recording['output_dir'], exist_ok=True)
     processor = AudioPostProcessor(settings)
+    
+    # 每个任务完成时立即输出结果，并按客户ID记录状态
+    statuses = {}
+    statuses_cond = threading.Condition()
+    def on_complete(call_info, output_path, status):
+        with statuses_cond:
+            statuses[call_info.get('customer_id')] = status
+            statuses_cond.notify_all()
+        name = os.path.basename(output_path) if output_path else '-'
+        print(f"  [{status}] {call_info.get('customer_name', '')}: {name}")
+    
+    processor.set_complete_callback(on_complete)
     processor.start()
     
     # 创建测试目录
@@ -58,83 +89,92 @@ def test_post_processing():
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
+    # (名称, 麦克风文件生成, 系统音频文件生成, 通话信息)
+    cases = [
+        ("测试1: 正常录音",
+         lambda f: create_test_audio(f, duration=10, frequency=440),   # 麦克风：440Hz
+         lambda f: create_test_audio(f, duration=10, frequency=880),   # 系统：880Hz
+         {'agent_phone': '13800138000', 'customer_name': '张三', 'customer_id': '12345'}),
+        ("测试2: 时长过短录音",
+         lambda f: create_test_audio(f, duration=2, frequency=440),    # 只有2秒
+         lambda f: create_test_audio(f, duration=2, frequency=880),
+         {'agent_phone': '13800138001', 'customer_name': '李四', 'customer_id': '12346'}),
+        ("测试3: 单侧静音录音",
+         lambda f: create_test_audio(f, duration=10, frequency=440),   # 麦克风有声音
+         lambda f: create_silent_audio(f, duration=10),                # 系统音频静音
+         {'agent_phone': '13800138002', 'customer_name': '王五', 'customer_id': '12347'}),
+        ("测试4: 合并失败",
+         lambda f: create_test_audio(f, duration=10, frequency=440),
+         lambda f: create_test_audio(f, duration=10, frequency=880),
+         # 客户名中含不存在的子目录，合并文件无法写出
+         {'agent_phone': '13800138003', 'customer_name': 'missing_dir/赵六', 'customer_id': '12348'}),
+    ]
+    # 各用例预期的完成状态
+    expected_statuses = {'12345': 'merged', '12346': 'rejected', '12347': 'rejected', '12348': 'error'}
+    
+    futures = []
+    failures = []
     try:
-        # 测试1: 正常录音（双路都有声音）
-        print("\n--- 测试1: 正常录音 ---")
-        mic_file1 = os.path.join(test_dir, f"mic_{timestamp}_test1.wav")
-        system_file1 = os.path.join(test_dir, f"system_{timestamp}_test1.wav")
-        
-        create_test_audio(mic_file1, duration=10, frequency=440)  # 麦克风：440Hz
-        create_test_audio(system_file1, duration=10, frequency=880)  # 系统：880Hz
-        
-        call_info1 = {
-            'agent_phone': '13800138000',
-            'customer_name': '张三',
-            'customer_id': '12345'
-        }
-        
-        processor.submit_recording(mic_file1, system_file1, call_info1)
-        
-        # 测试2: 时长过短的录音
-        print("\n--- 测试2: 时长过短录音 ---")
-        mic_file2 = os.path.join(test_dir, f"mic_{timestamp}_test2.wav")
-        system_file2 = os.path.join(test_dir, f"system_{timestamp}_test2.wav")
-        
-        create_test_audio(mic_file2, duration=2, frequency=440)  # 只有2秒
-        create_test_audio(system_file2, duration=2, frequency=880)
-        
-        call_info2 = {
-            'agent_phone': '13800138001',
-            'customer_name': '李四',
-            'customer_id': '12346'
-        }
-        
-        processor.submit_recording(mic_file2, system_file2, call_info2)
-        
-        # 测试3: 单侧静音录音
-        print("\n--- 测试3: 单侧静音录音 ---")
-        mic_file3 = os.path.join(test_dir, f"mic_{timestamp}_test3.wav")
-        system_file3 = os.path.join(test_dir, f"system_{timestamp}_test3.wav")
-        
-        create_test_audio(mic_file3, duration=10, frequency=440)  # 麦克风有声音
-        create_silent_audio(system_file3, duration=10)  # 系统音频静音
-        
-        call_info3 = {
-            'agent_phone': '13800138002',
-            'customer_name': '王五',
-            'customer_id': '12347'
-        }
-        
-        processor.submit_recording(mic_file3, system_file3, call_info3)
+        # 每个用例单独捕获异常，一个失败不影响其余用例
+        for n, (name, make_mic, make_system, call_info) in enumerate(cases, 1):
+            print(f"\n--- {name} ---")
+            try:
+                mic_file = os.path.join(test_dir, f"mic_{timestamp}_test{n}.wav")
+                system_file = os.path.join(test_dir, f"system_{timestamp}_test{n}.wav")
+                make_mic(mic_file)
+                make_system(system_file)
+                futures.append(processor.submit_recording(mic_file, system_file, call_info))
+            except Exception:
+                logger.exception(f"{name} 提交失败")
         
         # 等待处理完成
         print("\n等待后处理完成...")
-        time.sleep(15)
+        done, not_done = wait(futures, timeout=60)
+        if not_done:
+            print(f"⚠️ {len(not_done)} 个任务在60秒内未完成")
+            failures.append(f"{len(not_done)} 个任务超时")
+        # 完成回调在 Future 完成之后执行，再等回调全部到达
+        with statuses_cond:
+            statuses_cond.wait_for(lambda: len(statuses) >= len(futures), timeout=5)
         
         # 检查结果
         print("\n=== 处理结果检查 ===")
-        recordings_dir = settings.recording['output_dir']
-        files = os.listdir(recordings_dir)
-        merged_files = [f for f in files if f.startswith('merged_')]
+        merged_files = [f.result() for f in done if f.exception() is None and f.result()]
         
         print(f"生成的合并文件数量: {len(merged_files)}")
         for f in merged_files:
-            print(f"  - {f}")
+            print(f"  - {os.path.basename(f)}")
         
         # 预期结果：只有测试1应该生成合并文件
         if len(merged_files) == 1:
             print("✅ 测试通过：只有有效录音生成了合并文件")
         else:
             print(f"❌ 测试失败：预期1个合并文件，实际{len(merged_files)}个")
+            failures.append("合并文件数量不符")
         
-    except Exception as e:
-        print(f"测试过程中出现错误: {e}")
-        import traceback
-        traceback.print_exc()
+        # 合并失败应通过 Future 异常和 'error' 状态上报，而不是被当作无效录音
+        failed = [f for f in done if f.exception() is not None]
+        if len(failed) == 1:
+            print(f"✅ 测试通过：合并失败通过 Future 上报异常: {failed[0].exception()}")
+        else:
+            print(f"❌ 测试失败：预期1个失败任务，实际{len(failed)}个")
+            failures.append("失败任务数量不符")
+        
+        # 逐个用例核对完成状态
+        for customer_id, expected in expected_statuses.items():
+            actual = statuses.get(customer_id)
+            if actual == expected:
+                print(f"✅ {customer_id}: {actual}")
+            else:
+                print(f"❌ {customer_id}: 状态 {actual}，预期 {expected}")
+                failures.append(f"{customer_id} 状态为 {actual}，预期 {expected}")
     
     finally:
         processor.stop()
         print("\n后处理器已停止")
+    
+    # 任一检查失败即让测试失败（命令行运行时退出码非0）
+    assert not failures, "；".join(failures)
 
 if __name__ == "__main__":
     test_post_processing()
\ No newline at end of file
@@ -6,17 +6,21 @@
 
 import sys
 import os
+import re
 sys.path.append('src')
 
-from src.config.settings import Settings
+from src.config.settings import load_settings
 from src.audio.device_manager import DeviceManager
 from src.audio.recorder import AudioRecorder
 
+# 系统音频候选设备关键词（预编译为一个正则，一次扫描匹配全部关键词）
+SYSTEM_DEVICE_PATTERN = re.compile('|'.join(re.escape(k) for k in ['cable output', 'stereo mix', '立体声混音', '混音']))
+
 def main():
     print("=== 呼叫中心录音测试 ===")
     
     # 加载配置
-    settings = Settings("config.yaml")
+    settings = load_settings("config.yaml")
     
     # 设备管理
     device_manager = DeviceManager()
@@ -38,8 +42,7 @@ def main():
     print(f"\n请选择系统音频设备:")
     system_candidates = []
     for i, (idx, device) in enumerate(input_devices):
-        name = device['name'].lower()
-        if any(keyword in name for keyword in ['cable output', 'stereo mix', '立体声混音', '混音']):
+        if SYSTEM_DEVICE_PATTERN.search(device['name'].lower()):
             system_candidates.append((idx, device))
     
     if system_candidates:
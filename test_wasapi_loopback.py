@@ -7,10 +7,95 @@ WASAPI Loopback 测试脚本
 import sounddevice as sd
 import numpy as np
 import wave
-import time
 import sys
 import os
 import inspect
+import re
+import threading
+import ctypes
+import atexit
+from contextlib import contextmanager
+
+_SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from audio.pcm import float_to_int16
+
+# 项目内置的 WASAPI 录制器；导入一次，后续方法直接复用模块缓存
+try:
+    from audio.wasapi_recorder import (
+        WASAPIRecorder, raise_audio_thread_priority, revert_audio_thread_priority,
+    )
+except ImportError as e:
+    WASAPIRecorder = None
+    _WASAPI_IMPORT_ERROR = e
+
+    def raise_audio_thread_priority():
+        return None
+
+    def revert_audio_thread_priority(handle):
+        pass
+
+# 可选：安装了 soundfile 时由 libsndfile 负责 WAV 写入，否则退回标准库 wave
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+# PortAudio 枚举设备/Host API 代价较高，一次运行内只查询一次
+_HOSTAPIS = None
+_DEVICES = None
+
+# 设备名关键字预编译为单个正则，扫描时每个设备名只走一遍
+STEREO_MIX_KEYWORDS = [
+    'stereo mix', '立体声混音', 'what u hear', 'wave out mix', 'mix',
+    'vb-cable', 'cable input', 'cable output', 'voicemeeter', 'virtual cable',
+    'loopback'  # 不是必须，但有些设备会包含
+]
+FALLBACK_KEYWORDS = ['stereo mix', '立体声混音', 'what u hear', 'wave out mix']
+_STEREO_MIX_RE = re.compile('|'.join(map(re.escape, STEREO_MIX_KEYWORDS)))
+_FALLBACK_RE = re.compile('|'.join(map(re.escape, FALLBACK_KEYWORDS)))
+
+def hostapis():
+    """返回缓存的 Host API 列表"""
+    global _HOSTAPIS
+    if _HOSTAPIS is None:
+        _HOSTAPIS = tuple(sd.query_hostapis())
+    return _HOSTAPIS
+
+def devices():
+    """返回缓存的设备列表"""
+    global _DEVICES
+    if _DEVICES is None:
+        _DEVICES = tuple(sd.query_devices())
+    return _DEVICES
+
+def _wasapi_settings_has_loopback():
+    """sd.WasapiSettings 是否支持 loopback 参数（签名解析较慢，只在导入时做一次）"""
+    if not hasattr(sd, 'WasapiSettings'):
+        return False
+    try:
+        return 'loopback' in inspect.signature(sd.WasapiSettings).parameters
+    except Exception:
+        # 某些版本需要检查 __init__
+        try:
+            return 'loopback' in inspect.signature(sd.WasapiSettings.__init__).parameters
+        except Exception:
+            return False
+
+_WASAPI_LOOPBACK_OK = _wasapi_settings_has_loopback()
+
+_PA = None
+
+def pyaudio_instance():
+    """共享的 PyAudioWPatch 实例：PortAudio 只初始化一次，进程退出时统一 terminate"""
+    global _PA
+    if _PA is None:
+        import pyaudiowpatch as pyaudio
+        _PA = pyaudio.PyAudio()
+        atexit.register(_PA.terminate)
+    return _PA
 
 def check_environment():
     """检查环境支持情况"""
@@ -22,7 +107,7 @@ def check_environment():
     wasapi_id = None
     
     print("\n可用的Host APIs:")
-    for i, api in enumerate(sd.query_hostapis()):
+    for i, api in enumerate(hostapis()):
         print(f"  [{i}] {api['name']}")
         if 'WASAPI' in api['name']:
             wasapi_found = True
@@ -35,6 +120,199 @@ def check_environment():
     print(f"✅ 找到WASAPI: ID={wasapi_id}")
     return True, wasapi_id
 
+# 音频周期时长（毫秒），未设置时使用录文件场景的大块以摊薄每周期的回调开销
+LOOPBACK_PERIOD_MS = os.environ.get('WASAPI_LOOPBACK_PERIOD_MS')
+BULK_PERIOD_FRAMES = 4096
+
+def period_frames(samplerate, latency=None):
+    """每个音频周期的帧数：环境变量优先，其次按设备上报的低延迟周期，最后使用录文件用的大块
+    
+    latency 为设备的 defaultLowInputLatency（秒），换算后至少 256 帧并向上取整到 32 的倍数
+    """
+    if LOOPBACK_PERIOD_MS:
+        return max(64, samplerate * int(LOOPBACK_PERIOD_MS) // 1000)
+    if latency:
+        frames = max(256, int(latency * samplerate))
+        return (frames + 31) // 32 * 32
+    return BULK_PERIOD_FRAMES
+
+@contextmanager
+def timer_resolution(ms=1):
+    """录制期间临时提高 Windows 定时器精度（默认15.6ms），其他平台不做处理"""
+    winmm = getattr(ctypes, 'windll', None) and ctypes.windll.winmm
+    if winmm:
+        winmm.timeBeginPeriod(ms)
+    try:
+        yield
+    finally:
+        if winmm:
+            winmm.timeEndPeriod(ms)
+
+def record_to_wav(filename, frames, samplerate, device, channels=2, extra_settings=None, blocksize=1024):
+    """阻塞式 InputStream.read 边录边写：设备直接输出int16，每块原样写入文件，内存占用与时长无关
+    
+    返回整段录音的峰值幅度（归一化到 [0, 1]）
+    """
+    peak = 0
+    writer = WavStreamWriter(filename, samplerate, frames, channels=channels)
+    try:
+        with sd.InputStream(samplerate=samplerate, channels=channels, dtype='int16',
+                            device=device, extra_settings=extra_settings,
+                            blocksize=blocksize) as stream:
+            remaining = frames
+            while remaining > 0:
+                data, _ = stream.read(min(blocksize, remaining))
+                remaining -= len(data)
+                if data.size:
+                    # 转 Python int 再取负，避免 int16 的 -32768 取负溢出
+                    peak = max(peak, int(data.max()), -int(data.min()))
+                writer.write(data)
+    finally:
+        writer.close()
+    return peak / 32768.0
+
+def _surround_weights(gains):
+    """按 WASAPI 声道顺序给出的增益归一化为和为1的 float32 权重"""
+    w = np.asarray(gains, dtype=np.float32)
+    return w / w.sum()
+
+# 环绕声转单声道权重（WASAPI 顺序 FL FR FC LFE BL BR [SL SR]）：
+# 中置/环绕 -3dB、丢弃 LFE（ITU-R BS.775 常用做法），归一化后不会削波
+SURROUND_DOWNMIX_WEIGHTS = {
+    6: _surround_weights([1.0, 1.0, 0.7071, 0.0, 0.7071, 0.7071]),
+    8: _surround_weights([1.0, 1.0, 0.7071, 0.0, 0.7071, 0.7071, 0.7071, 0.7071]),
+}
+
+def downmix_int16(pcm, out, scratch, fscratch=None):
+    """int16 多声道 (n, channels) 混为单声道，结果写入预分配的 out/scratch 并返回 out[:n]
+    
+    int32 累加避免溢出；立体声走两路相加+右移的快速路径；5.1/7.1 用 einsum 按声道权重加权，
+    其余声道数取平均。fscratch 为加权时用的 float32 缓冲区
+    """
+    n, channels = pcm.shape
+    acc = scratch[:n]
+    weights = SURROUND_DOWNMIX_WEIGHTS.get(channels)
+    if channels == 2:
+        np.add(pcm[:, 0], pcm[:, 1], out=acc, dtype=np.int32)
+        np.right_shift(acc, 1, out=acc)
+    elif weights is not None:
+        mixed = fscratch[:n] if fscratch is not None else np.empty(n, dtype=np.float32)
+        np.einsum('fc,c->f', pcm, weights, out=mixed, casting='unsafe')
+        np.rint(mixed, out=mixed)
+        np.copyto(acc, mixed, casting='unsafe')
+    else:
+        pcm.sum(axis=1, dtype=np.int32, out=acc)
+        acc //= channels
+    dst = out[:n]
+    np.copyto(dst, acc, casting='unsafe')
+    return dst
+
+class WavStreamWriter:
+    """边录边写的 int16 WAV 写入器：回调里只追加原始帧，关闭时回填一次头部
+
+    有 soundfile 时直接交给 libsndfile，否则用 1MiB 缓冲文件 + wave.writeframesraw
+    """
+
+    def __init__(self, filename, samplerate, max_frames, channels=1):
+        self.filename = filename
+        if sf is not None:
+            self.sf = sf.SoundFile(filename, 'w', samplerate, channels, 'PCM_16', format='WAV')
+            self.raw = self.wf = None
+        else:
+            self.sf = None
+            self.raw = open(filename, 'wb', buffering=1 << 20)
+            self.wf = wave.open(self.raw, 'wb')
+            self.wf.setnchannels(channels)
+            self.wf.setsampwidth(2)
+            self.wf.setframerate(samplerate)
+        self.max_bytes = max_frames * channels * 2
+        self.written = 0
+        # 写满请求的帧数时置位，调用方据此结束等待
+        self.done = threading.Event()
+
+    def write(self, data):
+        src = memoryview(data).cast('B')
+        n = min(len(src), self.max_bytes - self.written)
+        if n > 0:
+            if self.sf is not None:
+                self.sf.buffer_write(src[:n], dtype='int16')
+            else:
+                self.wf.writeframesraw(src[:n])
+            self.written += n
+        if self.written >= self.max_bytes:
+            self.done.set()
+        return n
+
+    def close(self):
+        """补写头部并关闭文件，返回写入的字节数"""
+        if self.sf is not None:
+            self.sf.close()
+            return self.written
+        try:
+            self.wf.close()
+        finally:
+            self.raw.close()
+        return self.written
+
+class PcmRing:
+    """单生产者单消费者的 int16 环形缓冲：音频回调只做内存拷贝，写文件交给消费线程
+
+    head/tail 是单调递增的样本计数，分别只由生产者/消费者修改；生产者拷贝完数据后才发布 head。
+    缓冲区满时丢弃新数据而不是阻塞回调
+    """
+
+    def __init__(self, capacity):
+        self.buf = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.head = 0
+        self.tail = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def push(self, samples):
+        """生产者（音频回调）写入样本，返回实际写入数"""
+        n = min(len(samples), self.capacity - (self.head - self.tail))
+        start = self.head % self.capacity
+        first = min(n, self.capacity - start)
+        self.buf[start:start + first] = samples[:first]
+        self.buf[:n - first] = samples[first:n]
+        self.head += n
+        with self._cond:
+            self._cond.notify()
+        return n
+
+    def close(self):
+        """通知消费者不再有新数据"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def drain(self, sink):
+        """消费线程主循环：把就绪的数据段交给 sink，close 后取完剩余数据返回"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.head != self.tail or self.closed)
+            head = self.head
+            if head == self.tail:
+                return
+            start = self.tail % self.capacity
+            n = head - self.tail
+            first = min(n, self.capacity - start)
+            sink(self.buf[start:start + first])
+            if n > first:
+                sink(self.buf[:n - first])
+            self.tail = head
+
+def finalize_wav(filename, ok, success_msg, failure_msg):
+    """各方法统一的收尾：成功时报告文件名，否则删除残留文件并提示原因"""
+    if ok:
+        print(f"✅ {success_msg}！保存为: {filename}")
+        return True
+    if os.path.exists(filename):
+        os.remove(filename)
+    print(f"⚠️ {failure_msg}")
+    return False
+
 def test_wasapi_loopback():
     """测试WASAPI Loopback录制（无需立体声混音）"""
     print("\n=== WASAPI Loopback 测试 ===")
@@ -46,20 +324,20 @@ def test_wasapi_loopback():
 
     try:
         # 解析默认输出设备（全局默认优先，其次WASAPI默认）
-        devices = sd.query_devices()
+        device_list = devices()
         default_output = None
         try:
             default_output = sd.default.device[1]
         except Exception:
             default_output = None
         if default_output is None or default_output < 0:
-            api_info = sd.query_hostapis()[wasapi_id]
+            api_info = hostapis()[wasapi_id]
             default_output = api_info.get('default_output_device', -1)
         if default_output is None or default_output < 0:
             print("❌ 没有默认输出设备")
             return False
 
-        output_device = devices[default_output]
+        output_device = device_list[default_output]
         samplerate = int(output_device.get('default_samplerate') or 44100)
         print(f"默认输出设备: [{default_output}] {output_device['name']} | 采样率: {samplerate}")
 
@@ -67,47 +345,19 @@ def test_wasapi_loopback():
         print("\n尝试方法1: sounddevice + WasapiSettings(loopback=True)...")
         try:
             if hasattr(sd, 'WasapiSettings'):
-                has_loopback_param = False
-                try:
-                    sig = inspect.signature(sd.WasapiSettings)
-                    has_loopback_param = 'loopback' in sig.parameters
-                except Exception:
-                    # 某些版本需要检查 __init__
-                    try:
-                        sig = inspect.signature(sd.WasapiSettings.__init__)
-                        has_loopback_param = 'loopback' in sig.parameters
-                    except Exception:
-                        has_loopback_param = False
-
-                if has_loopback_param:
+                if _WASAPI_LOOPBACK_OK:
                     settings = sd.WasapiSettings(loopback=True)
                     duration = 3
                     frames = int(duration * samplerate)
                     print(f"开始录制系统音频 {duration} 秒（WASAPI Loopback）...")
-                    recording = sd.rec(
-                        frames,
-                        samplerate=samplerate,
-                        channels=2,
-                        dtype='float32',
-                        device=default_output,
-                        extra_settings=settings
-                    )
-                    sd.wait()
-
-                    max_amplitude = float(np.max(np.abs(recording))) if recording is not None else 0.0
+                    filename = "wasapi_loopback_test.wav"
+                    max_amplitude = record_to_wav(filename, frames, samplerate, default_output,
+                                                  extra_settings=settings,
+                                                  blocksize=period_frames(samplerate))
                     print(f"录制完成，最大音量: {max_amplitude:.4f}")
-                    if max_amplitude > 0.001:
-                        filename = "wasapi_loopback_test.wav"
-                        with wave.open(filename, 'wb') as wf:
-                            wf.setnchannels(2)
-                            wf.setsampwidth(2)
-                            wf.setframerate(samplerate)
-                            wf.writeframes((recording * 32767).astype(np.int16).tobytes())
-                        print(f"✅ 成功录制系统音频！保存为: {filename}")
-                        return True
-                    else:
-                        print("⚠️ 录制到音频但音量很小，可能没有播放音频")
-                        return True
+                    finalize_wav(filename, max_amplitude > 0.001, "成功录制系统音频",
+                                 "录制到音频但音量很小，可能没有播放音频")
+                    return True
                 else:
                     print("ℹ️ 当前 sounddevice 不支持 WasapiSettings(loopback) 参数")
             else:
@@ -115,54 +365,8 @@ def test_wasapi_loopback():
         except Exception as e:
             print(f"❌ 方法1失败: {e}")
 
-        # 方法2: 不依赖 WasapiSettings，扫描可用的 loopback/混音 输入设备直接录制
-        print("\n尝试方法2: 扫描 loopback 输入设备并直接录制...")
-        try:
-            stereo_mix_keywords = [
-                'stereo mix', '立体声混音', 'what u hear', 'wave out mix', 'mix',
-                'vb-cable', 'cable input', 'cable output', 'voicemeeter', 'virtual cable',
-                'loopback'  # 不是必须，但有些设备会包含
-            ]
-            candidate_id = None
-            for i, dev in enumerate(devices):
-                name = str(dev.get('name', '')).lower()
-                if dev.get('max_input_channels', 0) > 0 and any(k in name for k in stereo_mix_keywords):
-                    candidate_id = i
-                    break
-            if candidate_id is not None:
-                print(f"找到可能的系统音频输入设备: [{candidate_id}] {devices[candidate_id]['name']}")
-                duration = 3
-                frames = int(duration * samplerate)
-                print(f"开始录制系统音频 {duration} 秒（直接输入设备）...")
-                recording = sd.rec(
-                    frames,
-                    samplerate=samplerate,
-                    channels=2,
-                    dtype='float32',
-                    device=candidate_id
-                )
-                sd.wait()
-
-                max_amplitude = float(np.max(np.abs(recording))) if recording is not None else 0.0
-                print(f"录制完成，最大音量: {max_amplitude:.4f}")
-                if max_amplitude > 0.001:
-                    filename = "wasapi_device_scan_test.wav"
-                    with wave.open(filename, 'wb') as wf:
-                        wf.setnchannels(2)
-                        wf.setsampwidth(2)
-                        wf.setframerate(samplerate)
-                        wf.writeframes((recording * 32767).astype(np.int16).tobytes())
-                    print(f"✅ 方法2成功！保存为: {filename}")
-                    return True
-                else:
-                    print("⚠️ 方法2录制到音频但音量很小")
-            else:
-                print("❌ 未找到可用的 loopback/立体声混音 输入设备")
-        except Exception as e:
-            print(f"❌ 方法2失败: {e}")
-
-        # 方法3: 使用 PyAudioWPatch 的 WASAPI loopback（无需立体声混音/虚拟设备）
-        print("\n尝试方法3: 使用 PyAudioWPatch WASAPI Loopback...")
+        # 方法2: 使用 PyAudioWPatch 的 WASAPI loopback（无需立体声混音/虚拟设备）
+        print("\n尝试方法2: 使用 PyAudioWPatch WASAPI Loopback...")
         try:
             try:
                 import pyaudiowpatch as pyaudio
@@ -171,13 +375,17 @@ def test_wasapi_loopback():
                 print(f"❌ 无法导入 PyAudioWPatch: {e_imp!r}")
                 raise
 
-            p = None
             stream = None
             duration = 3
-            frames_collected = []
+            filename = "wasapi_pyaudio_test.wav"
+            writer = None
+            ring = None
+            consumer = None
+            # PortAudio 回调线程的 MMCSS 注册，录制结束时撤销
+            mmcss = {'boosted': False, 'handle': None}
 
             try:
-                p = pyaudio.PyAudio()
+                p = pyaudio_instance()
                 loop_info = None
                 try:
                     loop_info = p.get_default_wasapi_loopback()
@@ -229,13 +437,39 @@ def test_wasapi_loopback():
                 if rate is None:
                     raise RuntimeError(f"no_supported_rate_for_device_{device_index}")
                 print(f"使用采样率: {rate} Hz, 通道: {channels}")
+                # 输出为单声道 int16：回调写入环形缓冲，消费线程边录边写入文件
+                writer = WavStreamWriter(filename, rate, duration * rate)
+                target_samples = duration * rate
+                ring = PcmRing(rate * 2)
+                consumer = threading.Thread(target=ring.drain, args=(writer.write,),
+                                            name="LoopbackWavWriter", daemon=True)
+                consumer.start()
+
+                # 回调中复用的预分配缓冲区，避免每个音频周期分配新数组
+                frames_per_buffer = period_frames(rate, loop_info.get('defaultLowInputLatency'))
+                print(f"音频周期: {frames_per_buffer} 帧 ({frames_per_buffer * 1000 / rate:.1f} ms)")
+                i32_scratch = np.empty(frames_per_buffer, dtype=np.int32)
+                i16_scratch = np.empty(frames_per_buffer, dtype=np.int16)
+                f32_scratch = np.empty(frames_per_buffer, dtype=np.float32)
 
                 def _on_frames(in_data, frame_count, time_info, status):
+                    # 首次进入回调时提升 PortAudio 回调线程的优先级
+                    if not mmcss['boosted']:
+                        mmcss['boosted'] = True
+                        mmcss['handle'] = raise_audio_thread_priority()
                     if in_data:
-                        audio = np.frombuffer(in_data, dtype=np.int16).astype(np.float32) / 32768.0
-                        if channels > 1 and len(audio) % channels == 0:
-                            audio = audio.reshape(-1, channels).mean(axis=1)
-                        frames_collected.append((audio * 32767).astype(np.int16).tobytes())
+                        # 数据本身就是 int16，直接在整数域处理，不经过 float 往返
+                        pcm = np.frombuffer(in_data, dtype=np.int16)
+                        if channels == 1:
+                            ring.push(pcm)
+                        else:
+                            pcm = pcm.reshape(-1, channels)
+                            ring.push(downmix_int16(pcm, i16_scratch, i32_scratch, f32_scratch))
+                    if ring.head >= target_samples:
+                        # 最后一次回调：在回调线程上撤销 MMCSS 注册
+                        revert_audio_thread_priority(mmcss['handle'])
+                        mmcss['handle'] = None
+                        return (None, pyaudio.paComplete)
                     return (None, pyaudio.paContinue)
 
                 stream = p.open(
@@ -244,12 +478,13 @@ def test_wasapi_loopback():
                     rate=rate,
                     input=True,
                     input_device_index=device_index,
-                    frames_per_buffer=1024,
+                    frames_per_buffer=frames_per_buffer,
                     stream_callback=_on_frames,
                 )
-                stream.start_stream()
                 print(f"开始录制系统音频 {duration} 秒（PyAudioWPatch）...")
-                time.sleep(duration)
+                with timer_resolution():
+                    stream.start_stream()
+                    writer.done.wait(timeout=duration + 0.25)
             except Exception as e_start:
                 print(f"❌ PyAudioWPatch 录制启动失败: {e_start!r}")
             finally:
@@ -263,60 +498,82 @@ def test_wasapi_loopback():
                         stream.close()
                 except Exception:
                     pass
-                try:
-                    if p:
-                        p.terminate()
-                except Exception:
-                    pass
+                # 未录满就停止时回调没有机会撤销，流关闭后在这里补上
+                revert_audio_thread_priority(mmcss['handle'])
+                mmcss['handle'] = None
+                if consumer:
+                    ring.close()
+                    consumer.join()
 
-            if frames_collected:
-                filename = "wasapi_pyaudio_test.wav"
-                with wave.open(filename, 'wb') as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2)
-                    wf.setframerate(rate)
-                    wf.writeframes(b''.join(frames_collected))
-                print(f"✅ 方法3成功！保存为: {filename}")
+            written = writer.close() if writer else 0
+            if finalize_wav(filename, written > 0, "方法2成功", "方法2未采集到音频帧"):
                 return True
-            else:
-                print("⚠️ 方法3未采集到音频帧")
         except Exception as e:
-            print(f"❌ 方法3失败: {e}")
+            print(f"❌ 方法2失败: {e}")
 
-        # 方法4: 使用项目内置的底层 WASAPI 录制器（无需立体声混音）
-        print("\n尝试方法4: 使用内置 WASAPIRecorder（底层WASAPI Loopback）...")
+        # 方法3: 使用项目内置的底层 WASAPI 录制器（无需立体声混音）
+        print("\n尝试方法3: 使用内置 WASAPIRecorder（底层WASAPI Loopback）...")
         try:
-            sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-            from audio.wasapi_recorder import WASAPIRecorder
+            if WASAPIRecorder is None:
+                raise _WASAPI_IMPORT_ERROR
 
             duration = 3
             samplerate = samplerate or 44100
             recorder = WASAPIRecorder(sample_rate=samplerate)
-            frames_collected = []
+            filename = "wasapi_lowlevel_test.wav"
+            writer = WavStreamWriter(filename, samplerate, duration * samplerate)
 
             def on_audio(chunk: np.ndarray):
-                # chunk 为单声道 float32
-                frames_collected.append((chunk * 32767).astype(np.int16).tobytes())
+                # chunk 为单声道 float32，每次回调都是新数组，可原地转换
+                writer.write(float_to_int16(chunk))
 
             recorder.set_audio_callback(on_audio)
-            if not recorder.start_recording():
-                print("❌ WASAPIRecorder 启动失败")
-            else:
-                print(f"开始录制系统音频 {duration} 秒（WASAPIRecorder）...")
-                time.sleep(duration)
+            started = False
+            try:
+                with timer_resolution():
+                    started = recorder.start_recording()
+                    if started:
+                        print(f"开始录制系统音频 {duration} 秒（WASAPIRecorder）...")
+                        recorder.wait_for_frames(duration * samplerate, timeout=duration + 0.25)
+            except Exception as e_start:
+                print(f"❌ WASAPIRecorder 录制失败: {e_start!r}")
+            finally:
+                # 无论成功与否都停止录制器并关闭文件，未录到数据的文件由 finalize_wav 删除
                 recorder.stop_recording()
+                written = writer.close()
 
-                if frames_collected:
-                    filename = "wasapi_lowlevel_test.wav"
-                    with wave.open(filename, 'wb') as wf:
-                        wf.setnchannels(1)
-                        wf.setsampwidth(2)
-                        wf.setframerate(samplerate)
-                        wf.writeframes(b''.join(frames_collected))
-                    print(f"✅ 方法3成功！保存为: {filename}")
+            failure_msg = "方法3未采集到音频帧" if started else "WASAPIRecorder 启动失败"
+            if finalize_wav(filename, written > 0, "方法3成功", failure_msg):
+                return True
+        except Exception as e:
+            print(f"❌ 方法3失败: {e}")
+
+        # 方法4: 不依赖 WasapiSettings，扫描可用的 loopback/混音 输入设备直接录制
+        # 字符串扫描放在最后：前面的方法可以直接拿到默认 loopback 设备
+        print("\n尝试方法4: 扫描 loopback 输入设备并直接录制...")
+        try:
+            candidate_id = None
+            for i, dev in enumerate(device_list):
+                # 只看 WASAPI 下的设备，同一设备在 MME/DirectSound 等 Host API 下的副本直接跳过
+                if dev.get('hostapi') != wasapi_id:
+                    continue
+                name = str(dev.get('name', '')).lower()
+                if dev.get('max_input_channels', 0) > 0 and _STEREO_MIX_RE.search(name):
+                    candidate_id = i
+                    break
+            if candidate_id is not None:
+                print(f"找到可能的系统音频输入设备: [{candidate_id}] {device_list[candidate_id]['name']}")
+                duration = 3
+                frames = int(duration * samplerate)
+                print(f"开始录制系统音频 {duration} 秒（直接输入设备）...")
+                filename = "wasapi_device_scan_test.wav"
+                max_amplitude = record_to_wav(filename, frames, samplerate, candidate_id,
+                                              blocksize=period_frames(samplerate))
+                print(f"录制完成，最大音量: {max_amplitude:.4f}")
+                if finalize_wav(filename, max_amplitude > 0.001, "方法4成功", "方法4录制到音频但音量很小"):
                     return True
-                else:
-                    print("⚠️ 方法3未采集到音频帧")
+            else:
+                print("❌ 未找到可用的 loopback/立体声混音 输入设备")
         except Exception as e:
             print(f"❌ 方法4失败: {e}")
 
@@ -331,12 +588,10 @@ def fallback_test():
     """回退测试：检查是否有立体声混音"""
     print("\n=== 回退测试：立体声混音 ===")
     
-    stereo_mix_keywords = ['stereo mix', '立体声混音', 'what u hear', 'wave out mix']
-    
-    for i, device in enumerate(sd.query_devices()):
+    for i, device in enumerate(devices()):
         if device['max_input_channels'] > 0:
             name = device['name'].lower()
-            if any(keyword in name for keyword in stereo_mix_keywords):
+            if _FALLBACK_RE.search(name):
                 print(f"找到立体声混音设备: [{i}] {device['name']}")
                 return True
     